@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 import os
 from supabase import create_client, Client
 from dotenv import load_dotenv
@@ -6,9 +6,10 @@ from flask_restx import Api, Resource, Namespace, fields
 from flask_cors import CORS
 import threading
 import time
-from datetime import datetime
+from datetime import datetime, timezone
 from amqp_lib import publish_message
 import json
+import hashlib
 import requests
 
 # Load environment variables
@@ -129,10 +130,63 @@ RABBITMQ_PORT = int(os.environ.get("RABBITMQ_PORT", 5672))
 EXCHANGE_NAME = "notificationsS3"
 EXCHANGE_TYPE = "direct"
 
+# The allHubs payload is cached and rebuilt after this many seconds, or sooner when a hub
+# is created or renamed here; the TTL catches edits made directly in Supabase
+ALL_HUBS_CACHE_TTL_SECONDS = float(os.environ.get("ALL_HUBS_CACHE_TTL_SECONDS", "300"))
+
+class HubDirectory:
+    """
+    Serialized allHubs payload with its ETag and Last-Modified, so repeat requests skip
+    the Supabase query and clients holding the current ETag get an empty 304.
+    Last-Modified only moves when the payload actually changes.
+    """
+
+    def __init__(self, ttl_seconds=ALL_HUBS_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._body = None
+        self._etag = None
+        self._last_modified = None
+        self._built_at = 0.0
+
+    # Returns (body bytes, etag, last modified datetime), rebuilding the payload when it is stale
+    def current(self):
+        with self._lock:
+            if self._body is None or time.monotonic() - self._built_at >= self.ttl_seconds:
+                self._rebuild()
+            return self._body, self._etag, self._last_modified
+
+    # Called after writes that change a hub's ID, name or address
+    def invalidate(self):
+        with self._lock:
+            self._built_at = float("-inf")
+
+    def _rebuild(self):
+        hubs_response = supabase.table('hub').select('hubid, hubname, hubaddress').order('hubname').execute()
+
+        # Transform to camelCase for the response
+        result = []
+        for hub in hubs_response.data or []:
+            result.append({
+                "hubID": hub['hubid'],
+                "hubName": hub['hubname'],
+                "hubAddress": hub['hubaddress']
+            })
+
+        body = json.dumps(result, separators=(",", ":")).encode("utf-8")
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        if etag != self._etag:
+            self._last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        self._body, self._etag = body, etag
+        self._built_at = time.monotonic()
+
+hub_directory = HubDirectory()
+
 @internal_hub_ns.route('/allHubs')
 class AllHubs(Resource):
     @public_hub_ns.doc('get_all_hubs', description='Retrieve basic information about all hubs')
     @public_hub_ns.response(200, 'Success')
+    @public_hub_ns.response(304, 'Not Modified since the ETag or date the client sent')
     @public_hub_ns.response(500, 'Internal Server Error')
     def get(self):
         """
@@ -141,24 +195,19 @@ class AllHubs(Resource):
         This endpoint returns a simplified list of all hubs in the system,
         including just their ID, name, and address. This is useful for
         dropdowns and other UI elements that need to display hub options.
+        Responses carry an ETag and Last-Modified; send them back as
+        If-None-Match / If-Modified-Since to get a 304 when nothing changed.
         """
         try:
-            # Get all hubs
-            hubs_response = supabase.table('hub').select('hubid, hubname, hubaddress').order('hubname').execute()
-            
-            if not hubs_response.data:
-                return [], 200  # Return empty list if no hubs
-            
-            # Transform to camelCase for the response
-            result = []
-            for hub in hubs_response.data:
-                result.append({
-                    "hubID": hub['hubid'],
-                    "hubName": hub['hubname'],
-                    "hubAddress": hub['hubaddress']
-                })
-            
-            return result, 200
+            body, etag, last_modified = hub_directory.current()
+
+            response = Response(body, status=200, mimetype="application/json")
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            # Caches may keep the list but must revalidate it before use
+            response.cache_control.no_cache = True
+            # Turns the response into an empty 304 when the client's copy is current
+            return response.make_conditional(request)
         
         except Exception as e:
             return {"error": str(e)}, 500
@@ -261,6 +310,7 @@ class UpdateInventory(Resource):
                     return {"error": f"Failed to create new hub with ID {hub_id}"}, 500
                 
                 print(f"Successfully created hub with ID {hub_id}")
+                hub_directory.invalidate()
             else:
                 # Hub exists - check if name or address needs to be updated
                 existing_hub = hub_response.data[0]
@@ -276,6 +326,7 @@ class UpdateInventory(Resource):
                 
                 if update_fields:
                     supabase.table('hub').update(update_fields).eq('hubid', hub_id).execute()
+                    hub_directory.invalidate()
             
             # Process existing items
             if 'items' in data and data['items']:
@@ -0,0 +1,64 @@
+import re
+
+# "#01-1500", "# 01 - 1500", "#B1-23A"
+UNIT_NUMBER_PATTERN = re.compile(r"#\s*[A-Z]?\d{1,3}\s*-\s*\d{1,5}[A-Z]?\b")
+# "S461051", "S 461051", "(S) 461051", "SINGAPORE 461051", "SINGAPORE461051", "SINGAPORE (461051)"
+POSTAL_CODE_PATTERN = re.compile(r"(?:\bSINGAPORE(?![A-Z])|\(S\)|\bS)\s*\(?(\d{6})\)?(?!\d)")
+TRAILING_POSTAL_CODE_PATTERN = re.compile(r"\b(\d{6})\s*$")
+TRAILING_COUNTRY_PATTERN = re.compile(r"\bSINGAPORE\s*$")
+PUNCTUATION_PATTERN = re.compile(r"[,;.]+")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Whole-word street abbreviations common in Singapore addresses
+ABBREVIATIONS = {
+    "AVE": "AVENUE",
+    "BLK": "BLOCK",
+    "BT": "BUKIT",
+    "CL": "CLOSE",
+    "CRES": "CRESCENT",
+    "CTRL": "CENTRAL",
+    "DR": "DRIVE",
+    "JLN": "JALAN",
+    "LOR": "LORONG",
+    "NTH": "NORTH",
+    "RD": "ROAD",
+    "ST": "STREET",
+    "STH": "SOUTH",
+    "UPP": "UPPER",
+}
+
+
+# Function to find the postal code in an uppercased address
+# returns the match with the 6 digits as group(1), or None if the address has none
+def match_postal_code(key):
+    return POSTAL_CODE_PATTERN.search(key) or TRAILING_POSTAL_CODE_PATTERN.search(key)
+
+
+# Function to expand one street abbreviation given the word before it
+# "ST" at the start of the street name is SAINT ("St. Andrew's Road", "Blk 5 St George's Road"),
+# so it only becomes STREET after a word of the road name ("Orchard St", "Jurong West St 42")
+def expand_abbreviation(word, previous):
+    if word == "ST" and (previous is None or previous == "BLK" or previous[0].isdigit()):
+        return word
+    return ABBREVIATIONS.get(word, word)
+
+
+# Function to canonicalize an address into a stable key for caching and deduplication
+# strips unit numbers, rewrites postal codes as "SINGAPORE 123456", expands abbreviations
+# and normalizes case, punctuation and whitespace
+def normalize_address(address):
+    key = address.upper()
+    key = UNIT_NUMBER_PATTERN.sub(" ", key)
+
+    postal_code = None
+    match = match_postal_code(key)
+    if match:
+        postal_code = match.group(1)
+        key = key[:match.start()] + " " + key[match.end():]
+    key = TRAILING_COUNTRY_PATTERN.sub(" ", PUNCTUATION_PATTERN.sub(" ", key).strip())
+
+    words = [word for word in WHITESPACE_PATTERN.split(key) if word]
+    words = [expand_abbreviation(word, words[i - 1] if i else None) for i, word in enumerate(words)]
+    if postal_code is not None:
+        words += ["SINGAPORE", postal_code]
+    return " ".join(words)
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+
+import aiohttp
+from yarl import URL
+
+import extra_functions
+from address_normalizer import normalize_address
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncGeocoder:
+    """
+    Non-blocking geocoding for the grpc.aio server mode.
+    Addresses the postal table or geocode cache can answer are resolved inline, exactly as
+    in convert_addresses. Misses are fetched with aiohttp, at most max_in_flight at a time,
+    and concurrent misses for one normalized address share a single request. Answers go
+    into the shared GeocodeCache, so the matching pipeline that runs afterwards finds every
+    coordinate there without touching the network.
+    Call start() on the event loop the server runs on.
+    """
+
+    def __init__(self, max_in_flight=extra_functions.GEOCODE_MAX_WORKERS, timeout_seconds=extra_functions.GEOCODE_HTTP_TIMEOUT_SECONDS):
+        self.max_in_flight = max_in_flight
+        self.timeout_seconds = timeout_seconds
+        self._semaphore = None
+        self._session = None
+        # normalized address -> task fetching it
+        self._flights = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def start(self):
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_in_flight),
+            timeout=aiohttp.ClientTimeout(total=self.timeout_seconds),
+        )
+
+    async def close(self):
+        await self._session.close()
+
+    # Function to geocode the addresses a pipeline will need before it runs
+    # waits at most deadline_seconds, and never past request_deadline (RequestDeadline)
+    # returns the set of normalized addresses still outstanding when time ran out; addresses
+    # that failed to geocode are not in it, they are skipped like in convert_addresses
+    async def prefetch(self, addresses, request_deadline, deadline_seconds=extra_functions.GEOCODE_DEADLINE_SECONDS):
+        spellings_by_key = {}
+        for address in dict.fromkeys(addresses):
+            spellings_by_key.setdefault(normalize_address(address), []).append(address)
+        _, misses = extra_functions.resolve_locally(spellings_by_key)
+        if not misses:
+            return set()
+
+        timeout = deadline_seconds
+        remaining = request_deadline.remaining()
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+        pending = {asyncio.ensure_future(self._geocode(key, address)): key for key, address in misses}
+        try:
+            _, not_done = await asyncio.wait(pending, timeout=max(timeout, 0))
+        finally:
+            # Only this request stops waiting; shared fetches carry on and still fill the cache
+            for task in pending:
+                task.cancel()
+        if not_done:
+            logger.warning(f"Geocoding deadline hit, {len(not_done)} of {len(pending)} addresses skipped")
+        return {pending[task] for task in not_done}
+
+    async def _geocode(self, key, address):
+        flight = self._flights.get(key)
+        if flight is None:
+            self.leaders += 1
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(self._fetch_and_cache(key, address)))
+            flight.task.add_done_callback(lambda task: self._land(key, flight))
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Geocoding failed for {address}: {str(e)}")
+            return None
+        finally:
+            flight.waiters -= 1
+            # Nobody wants the answer any more, so free its place in the queue for live requests
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def _land(self, key, flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Mark the error as seen, in case every waiter had already given up
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    async def _fetch_and_cache(self, key, address):
+        # Another request may have filled the cache since the miss
+        coordinate = extra_functions.geocode_cache.get(key, count=False)
+        if coordinate is not None:
+            return coordinate
+        async with self._semaphore:
+            # geocode_url already percent-encodes the address
+            async with self._session.get(URL(extra_functions.geocode_url(address), encoded=True)) as response:
+                response.raise_for_status()
+                result = await response.json(content_type=None)
+        coordinate = result["results"][0]["geometry"]["location"]
+        extra_functions.geocode_cache.put(key, coordinate)
+        return coordinate
+
+    def stats(self):
+        return {"leaders": self.leaders, "coalesced": self.coalesced, "inFlight": len(self._flights)}
@@ -0,0 +1,66 @@
+"""
+Measure how much address normalization deduplicates an address corpus.
+Run from services/atomic/locating:
+    python benchmarks/address_dedup.py addresses.txt [more.json ...]
+
+Text files are read one address per line. JSON files may be a list of strings or a list
+of objects with userAddress / hubAddress / productAddress fields (e.g. a dump of the
+account service's /userAddress volunteerList or the hub service's allHubs).
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from address_normalizer import normalize_address  # noqa: E402
+
+ADDRESS_FIELDS = ("userAddress", "hubAddress", "productAddress")
+
+
+def read_addresses(path):
+    with open(path) as f:
+        if not path.endswith(".json"):
+            return [line.strip() for line in f if line.strip()]
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("volunteerList", [])
+    addresses = []
+    for entry in data:
+        if isinstance(entry, str):
+            addresses.append(entry)
+            continue
+        addresses.extend(entry[field] for field in ADDRESS_FIELDS if entry.get(field))
+    return addresses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--show", type=int, default=10, help="print the N keys with the most spellings")
+    args = parser.parse_args()
+
+    addresses = [address for path in args.paths for address in read_addresses(path)]
+    raw_unique = set(addresses)
+    spellings = {}
+    for address in raw_unique:
+        spellings.setdefault(normalize_address(address), set()).add(address)
+
+    total = len(addresses)
+    print(f"addresses:               {total}")
+    print(f"unique raw spellings:    {len(raw_unique)}")
+    print(f"unique normalized keys:  {len(spellings)}")
+    if raw_unique:
+        saved = len(raw_unique) - len(spellings)
+        print(f"geocoding calls saved:   {saved} ({saved / len(raw_unique):.1%} of raw unique)")
+
+    merged = Counter({key: len(variants) for key, variants in spellings.items() if len(variants) > 1})
+    for key, count in merged.most_common(args.show):
+        print(f"\n{key}  <- {count} spellings")
+        for variant in sorted(spellings[key]):
+            print(f"    {variant}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Micro-benchmark: scalar math haversine loop vs the vectorised NumPy versions in extra_functions.
+Run from services/atomic/locating:  python benchmarks/bench_haversine.py [--sizes 100 1000 10000 100000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from extra_functions import haversine, haversine_many, haversine_matrix  # noqa: E402
+
+# Rough Singapore bounding box
+LAT_RANGE = (1.22, 1.47)
+LNG_RANGE = (103.60, 104.05)
+
+
+def random_points(n, rng):
+    return rng.uniform(*LNG_RANGE, n), rng.uniform(*LAT_RANGE, n)
+
+
+def best_of(fn, repeat):
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--hubs", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    center_lng, center_lat = 103.9223963418113, 1.323104904706169
+
+    print(f"{'points':>8} {'scalar one-to-N':>16} {'numpy one-to-N':>16} {'speedup':>8} {'scalar NxM':>12} {'numpy NxM':>12} {'speedup':>8}")
+    for n in args.sizes:
+        lngs, lats = random_points(n, rng)
+        lng_list, lat_list = lngs.tolist(), lats.tolist()
+        hub_lngs, hub_lats = random_points(args.hubs, rng)
+        hub_lng_list, hub_lat_list = hub_lngs.tolist(), hub_lats.tolist()
+
+        scalar = best_of(lambda: [haversine(center_lng, center_lat, x, y) for x, y in zip(lng_list, lat_list)], args.repeat)
+        vector = best_of(lambda: haversine_many(center_lng, center_lat, lngs, lats), args.repeat)
+
+        scalar_matrix = best_of(
+            lambda: [[haversine(hx, hy, x, y) for x, y in zip(lng_list, lat_list)] for hx, hy in zip(hub_lng_list, hub_lat_list)],
+            args.repeat,
+        )
+        vector_matrix = best_of(lambda: haversine_matrix(hub_lngs, hub_lats, lngs, lats), args.repeat)
+
+        # Sanity check that both paths agree
+        expected = np.array([haversine(center_lng, center_lat, x, y) for x, y in zip(lng_list, lat_list)])
+        assert np.allclose(expected, haversine_many(center_lng, center_lat, lngs, lats))
+
+        print(
+            f"{n:>8} {scalar * 1e3:>14.3f}ms {vector * 1e3:>14.3f}ms {scalar / vector:>7.1f}x "
+            f"{scalar_matrix * 1e3:>10.3f}ms {vector_matrix * 1e3:>10.3f}ms {scalar_matrix / vector_matrix:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+End-to-end benchmark of getFilteredUsers over synthetic Singapore-like populations.
+Each (population, mode) run happens in a fresh subprocess, with its own geocode cache,
+volunteer index and peak RSS, against fake_maps_server.py as the geocoder.
+Run from services/atomic/locating:
+    python benchmarks/bench_locating.py [--sizes 100 1000 10000 100000] [--modes inprocess grpc]
+                                        [--output results.json]
+
+Volunteers are spread over residential postal sectors with addresses such as
+"Blk 123 Synthetic Street 7 Singapore 520123" and twelve hubs sit in distinct sectors.
+Volunteer and hub addresses are preloaded into the geocode cache during setup, as a
+long-running service's cache would hold them. Every request uses a new product address, so each one
+pays one geocoding round trip through the fake server (--latency-ms).
+Requests set allowPartial, so a run that hits the server's geocoding deadline still completes;
+"truncated" counts those responses, and their latency and matches describe a partial roster.
+
+modes:
+    inprocess   LocateService.getFilteredUsers called directly
+    grpc        the same servicer behind a local grpc.server, called through a stub
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent import futures
+
+import numpy as np
+
+LOCATING_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Postal sectors of the larger HDB towns, weighted roughly by population
+RESIDENTIAL_SECTORS = {
+    52: 6, 46: 5, 56: 5, 64: 6, 73: 6, 82: 5, 54: 5, 65: 4, 67: 4, 76: 4,
+    31: 3, 38: 3, 40: 3, 51: 3, 57: 3, 60: 3, 68: 3, 75: 3, 79: 2, 16: 2,
+    12: 2, 27: 2, 47: 2, 53: 2, 55: 2,
+}
+HUB_SECTORS = [52, 46, 56, 64, 73, 82, 54, 31, 16, 60, 38, 75]
+
+
+class BenchmarkContext:
+    # Minimal ServicerContext for in-process calls: always active, no deadline
+    def is_active(self):
+        return True
+
+    def time_remaining(self):
+        return None
+
+
+def synthetic_addresses(n, rng):
+    sectors = np.array(list(RESIDENTIAL_SECTORS))
+    weights = np.array(list(RESIDENTIAL_SECTORS.values()), dtype=float)
+    chosen = rng.choice(sectors, size=n, p=weights / weights.sum())
+    rests = rng.integers(0, 10000, size=n)
+    return [
+        f"Blk {rest % 900 + 1} Synthetic Street {rest % 30 + 1} Singapore {sector * 10000 + rest:06d}"
+        for sector, rest in zip(chosen.tolist(), rests.tolist())
+    ]
+
+
+def percentile_ms(latencies, q):
+    return float(np.percentile(latencies, q) * 1e3) if latencies else None
+
+
+def run_single(args):
+    # Settings must be in the environment before locating modules read them
+    workdir = tempfile.mkdtemp(prefix="bench-locating-")
+    os.environ["GEOCODE_CACHE_PATH"] = os.path.join(workdir, "geocode_cache.sqlite3")
+    os.environ.setdefault("POSTAL_TABLE_PATH", os.path.join(workdir, "missing-postal-table.bin"))
+    os.environ.setdefault("GRPC_MAX_RECEIVE_MESSAGE_MB", "64")
+    # Room for the whole roster, otherwise the largest populations evict their own addresses
+    os.environ.setdefault("GEOCODE_CACHE_MAX_ENTRIES", str(max(50000, 2 * args.volunteers)))
+    sys.path.insert(0, LOCATING_DIR)
+    import grpc
+    import extra_functions
+    import locate_pb2
+    import locate_pb2_grpc
+    import locating
+    from address_normalizer import normalize_address
+    from fake_maps_server import fake_coordinate, start_server
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    maps = start_server(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, seed=args.seed)
+    extra_functions.GEOCODE_BASE_URL = f"http://127.0.0.1:{maps.server_port}"
+
+    rng = np.random.default_rng(args.seed)
+    volunteer_addresses = synthetic_addresses(args.volunteers, rng)
+    hub_addresses = [f"{sector} Hub Road Singapore {sector * 10000 + 1:06d}" for sector in HUB_SECTORS]
+
+    setup_started = time.perf_counter()
+    keys = {normalize_address(address) for address in volunteer_addresses + hub_addresses}
+    for key in keys:
+        extra_functions.geocode_cache.put(key, fake_coordinate(key))
+    volunteers = [
+        locate_pb2.volunteerInfo(userId=f"volunteer-{k}", userAddress=address)
+        for k, address in enumerate(volunteer_addresses)
+    ]
+    hubs = [
+        locate_pb2.hubInfo(hubID=k + 1, hubName=f"Hub {k + 1}", hubAddress=address)
+        for k, address in enumerate(hub_addresses)
+    ]
+
+    product_addresses = synthetic_addresses(args.requests + args.warmup, np.random.default_rng(args.seed + 1))
+
+    def request(k):
+        return locate_pb2.inputBody(
+            productId=f"product-{k}",
+            productAddress=product_addresses[k],
+            volunteerList=volunteers,
+            hubs=hubs,
+            allowPartial=True,
+        )
+
+    service = locating.LocateService()
+    server = None
+    if args.mode == "inprocess":
+        context = BenchmarkContext()
+        call = lambda k: service.getFilteredUsers(request(k), context)  # noqa: E731
+    else:
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=locating.GRPC_MAX_WORKERS), options=locating.server_options())
+        locate_pb2_grpc.add_locateServicer_to_server(service, server)
+        port = server.add_insecure_port("127.0.0.1:0")
+        server.start()
+        channel = grpc.insecure_channel(
+            f"127.0.0.1:{port}",
+            options=[("grpc.max_send_message_length", -1), ("grpc.max_receive_message_length", -1)],
+        )
+        stub = locate_pb2_grpc.locateStub(channel)
+        call = lambda k: stub.getFilteredUsers(request(k))  # noqa: E731
+
+    # The first call indexes the roster; keep it and the warmup out of the measurements
+    for k in range(args.warmup):
+        call(k)
+    setup_seconds = time.perf_counter() - setup_started
+    maps.reset()
+
+    latencies = []
+    matched = []
+    truncated = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.max_seconds
+
+    def timed(k):
+        if time.perf_counter() > deadline and k >= args.warmup + args.min_requests:
+            return
+        started = time.perf_counter()
+        response = call(k)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            matched.append(len(response.userList))
+            truncated.append(response.truncated)
+            if response.error:
+                raise RuntimeError(f"{response.productId}: {response.error}")
+
+    started = time.perf_counter()
+    with futures.ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(timed, range(args.warmup, args.warmup + args.requests)))
+    wall = time.perf_counter() - started
+
+    if server is not None:
+        server.stop(None)
+    maps.shutdown()
+
+    return {
+        "volunteers": args.volunteers,
+        "mode": args.mode,
+        "requests": len(latencies),
+        "concurrency": args.concurrency,
+        "geocode_latency_ms": args.latency_ms,
+        # Responses cut off by the geocoding deadline; their numbers describe a partial roster
+        "truncated": sum(truncated),
+        "geocode_deadline_s": extra_functions.GEOCODE_DEADLINE_SECONDS,
+        "setup_s": round(setup_seconds, 3),
+        "p50_ms": percentile_ms(latencies, 50),
+        "p95_ms": percentile_ms(latencies, 95),
+        "p99_ms": percentile_ms(latencies, 99),
+        "mean_ms": float(np.mean(latencies) * 1e3) if latencies else None,
+        "throughput_rps": len(latencies) / wall if wall else None,
+        "mean_matches": float(np.mean(matched)) if matched else None,
+        "geocode_calls": maps.stats().get("geocode", 0),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=LOCATING_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--modes", nargs="+", choices=["inprocess", "grpc"], default=["inprocess", "grpc"])
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per run")
+    parser.add_argument("--min-requests", type=int, default=10, help="requests always measured, even past --max-seconds")
+    parser.add_argument("--max-seconds", type=float, default=60, help="stop issuing requests after this long")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=20, help="injected geocoding latency")
+    parser.add_argument("--jitter-ms", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--volunteers", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: one run, result as JSON on stdout
+    if args.volunteers is not None:
+        print(json.dumps(run_single(args)))
+        return
+
+    shared = [
+        "--requests", str(args.requests), "--min-requests", str(args.min_requests),
+        "--max-seconds", str(args.max_seconds), "--warmup", str(args.warmup),
+        "--concurrency", str(args.concurrency), "--latency-ms", str(args.latency_ms),
+        "--jitter-ms", str(args.jitter_ms), "--seed", str(args.seed),
+    ]
+    results = []
+    for size in args.sizes:
+        for mode in args.modes:
+            print(f"running {size} volunteers, {mode}...", file=sys.stderr)
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--volunteers", str(size), "--mode", mode] + shared,
+                capture_output=True, text=True, cwd=LOCATING_DIR,
+            )
+            if completed.returncode != 0:
+                print(completed.stderr, file=sys.stderr)
+                results.append({"volunteers": size, "mode": mode, "error": completed.stderr.strip().splitlines()[-1:]})
+                continue
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            print(
+                f"  p50 {result['p50_ms']:.1f}ms  p95 {result['p95_ms']:.1f}ms  p99 {result['p99_ms']:.1f}ms  "
+                f"{result['throughput_rps']:.1f} req/s  peak {result['peak_rss_mb']:.0f}MB"
+                f"{'  TRUNCATED ' + str(result['truncated']) + '/' + str(result['requests']) if result['truncated'] else ''}",
+                file=sys.stderr,
+            )
+            results.append(result)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("volunteers", "mode", "output")},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
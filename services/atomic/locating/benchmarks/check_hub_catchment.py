@@ -0,0 +1,83 @@
+"""
+Regression check: HubCatchment.closest() against a brute-force scan over every hub.
+Random hub layouts are built, then random points (inside the hubs' area, near
+catchment boundaries and outside the table margin) are looked up both ways. Exits
+non-zero if any lookup returns a hub farther than the true closest one.
+Run from services/atomic/locating:
+    python benchmarks/check_hub_catchment.py [--points 20000] [--hub-counts 1 2 12 200] [--seed 42]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from extra_functions import haversine_many  # noqa: E402
+from hub_catchment import HubCatchment  # noqa: E402
+
+# Rough Singapore bounding box, widened so some points fall outside the catchment table
+LAT_RANGE = (1.22, 1.47)
+LNG_RANGE = (103.60, 104.05)
+OUTER_DEGREES = 0.3
+
+
+def random_hubs(count, rng):
+    return [
+        {"hubID": k, "hubName": f"hub {k}", "hubAddress": f"{k} Hub Road", "lat": float(lat), "lng": float(lng)}
+        for k, (lat, lng) in enumerate(zip(rng.uniform(*LAT_RANGE, count), rng.uniform(*LNG_RANGE, count)))
+    ]
+
+
+def random_points(count, hubs, rng):
+    inside = count * 3 // 4
+    lats = list(rng.uniform(*LAT_RANGE, inside))
+    lngs = list(rng.uniform(*LNG_RANGE, inside))
+    # Midpoints between two hubs sit on a catchment boundary
+    for _ in range(count // 8):
+        a, b = rng.integers(len(hubs), size=2)
+        lats.append((hubs[a]["lat"] + hubs[b]["lat"]) / 2 + rng.normal(0, 1e-4))
+        lngs.append((hubs[a]["lng"] + hubs[b]["lng"]) / 2 + rng.normal(0, 1e-4))
+    outside = count - len(lats)
+    lats += list(rng.uniform(LAT_RANGE[0] - OUTER_DEGREES, LAT_RANGE[1] + OUTER_DEGREES, outside))
+    lngs += list(rng.uniform(LNG_RANGE[0] - OUTER_DEGREES, LNG_RANGE[1] + OUTER_DEGREES, outside))
+    return lats, lngs
+
+
+def check(hub_count, points, cell_km, rng):
+    hubs = random_hubs(hub_count, rng)
+    catchment = HubCatchment(hubs, cell_km=cell_km)
+    hub_lats = np.array([hub["lat"] for hub in hubs])
+    hub_lngs = np.array([hub["lng"] for hub in hubs])
+
+    mismatches = 0
+    lats, lngs = random_points(points, hubs, rng)
+    for lat, lng in zip(lats, lngs):
+        hub, distance = catchment.closest(lat, lng)
+        expected = float(haversine_many(lng, lat, hub_lngs, hub_lats).min())
+        # Ties may pick either hub; only a strictly farther hub is wrong
+        if distance > expected + 1e-9:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  ({lat:.6f}, {lng:.6f}): got hub {hub['hubID']} at {distance:.6f}km, closest is {expected:.6f}km")
+    print(f"{hub_count:>5} hubs, {len(lats)} points, {len(catchment.table)} cells: {mismatches} mismatches")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--hub-counts", type=int, nargs="+", default=[1, 2, 12, 200])
+    parser.add_argument("--cell-km", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    mismatches = sum(check(hub_count, args.points, args.cell_km, rng) for hub_count in args.hub_counts)
+    if mismatches:
+        sys.exit(f"FAILED: {mismatches} lookups did not return the closest hub")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
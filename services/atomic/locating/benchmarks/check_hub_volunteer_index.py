@@ -0,0 +1,114 @@
+"""
+Regression check: VolunteerIndex.within_radius_near_hub(), which answers from the
+HubVolunteerIndex entry when it covers the query, against a brute-force scan over
+every volunteer. Products are matched one after another while volunteers are added,
+moved and removed between them, so the incremental entry updates are exercised too.
+Exits non-zero on any difference.
+Run from services/atomic/locating:
+    python benchmarks/check_hub_volunteer_index.py [--products 3000] [--volunteers 20000] [--seed 42]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from extra_functions import VOLUNTEER_RADIUS_KM, haversine_many  # noqa: E402
+from spatial_index import VolunteerIndex  # noqa: E402
+
+# Rough Singapore bounding box
+LAT_RANGE = (1.22, 1.47)
+LNG_RANGE = (103.60, 104.05)
+
+
+def brute_force(volunteers, lat, lng, radius_km):
+    if not volunteers:
+        return []
+    ids = list(volunteers)
+    distances = haversine_many(lng, lat, [volunteers[i][1] for i in ids], [volunteers[i][0] for i in ids])
+    within = np.flatnonzero(distances < radius_km)
+    return [ids[k] for k in within[np.argsort(distances[within], kind="stable")]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=3000)
+    parser.add_argument("--volunteers", type=int, default=20000)
+    parser.add_argument("--hubs", type=int, default=12)
+    parser.add_argument("--changes", type=int, default=20, help="volunteer upserts/moves/removes between products")
+    parser.add_argument("--hub-radius-km", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    index = VolunteerIndex(hub_radius_km=args.hub_radius_km)
+    volunteers = {}
+    # Registered ids in a list as well, so a random one can be picked without copying the dict
+    ids = []
+    for k, (lat, lng) in enumerate(zip(rng.uniform(*LAT_RANGE, args.volunteers), rng.uniform(*LNG_RANGE, args.volunteers))):
+        volunteers[f"v{k}"] = (float(lat), float(lng))
+        ids.append(f"v{k}")
+        index.upsert(f"v{k}", float(lat), float(lng))
+    hubs = [
+        {"hubID": k, "lat": float(lat), "lng": float(lng)}
+        for k, (lat, lng) in enumerate(zip(rng.uniform(*LAT_RANGE, args.hubs), rng.uniform(*LNG_RANGE, args.hubs)))
+    ]
+
+    next_id = args.volunteers
+    mismatches = 0
+    from_hub_entry = 0
+    for product in range(args.products):
+        # Interleave roster changes with the queries: new volunteers, moves and removals
+        for _ in range(args.changes):
+            action = rng.integers(3)
+            if action == 0 or not ids:
+                user_id = f"v{next_id}"
+                next_id += 1
+                ids.append(user_id)
+            else:
+                position = int(rng.integers(len(ids)))
+                user_id = ids[position]
+                if action == 2:
+                    ids[position] = ids[-1]
+                    ids.pop()
+                    del volunteers[user_id]
+                    index.remove(user_id)
+                    continue
+            # Keep most moves close to a hub so they cross hub entry boundaries
+            hub = hubs[rng.integers(len(hubs))]
+            lat = float(hub["lat"] + rng.normal(0, 0.04))
+            lng = float(hub["lng"] + rng.normal(0, 0.04))
+            volunteers[user_id] = (lat, lng)
+            index.upsert(user_id, lat, lng)
+
+        # The product sits near its closest hub; the query is centred on their midpoint
+        hub = hubs[rng.integers(len(hubs))]
+        product_lat = hub["lat"] + rng.normal(0, 0.02)
+        product_lng = hub["lng"] + rng.normal(0, 0.02)
+        lat, lng = (product_lat + hub["lat"]) / 2, (product_lng + hub["lng"]) / 2
+
+        with index.lock:
+            if index.hub_index.candidates(hub, lat, lng, VOLUNTEER_RADIUS_KM, index._within_radius_slots) is not None:
+                from_hub_entry += 1
+        got = index.within_radius_near_hub(hub, lat, lng, VOLUNTEER_RADIUS_KM)
+        expected = brute_force(volunteers, lat, lng, VOLUNTEER_RADIUS_KM)
+        if got != expected:
+            mismatches += 1
+            if mismatches <= 5:
+                print(
+                    f"  product {product}: {len(set(got) - set(expected))} extra, {len(set(expected) - set(got))} missing"
+                    f"{'' if set(got) != set(expected) else ', same volunteers in a different order'}"
+                )
+
+    print(
+        f"{args.products} products, {len(volunteers)} volunteers at the end, {args.hubs} hubs: "
+        f"{from_hub_entry} answered from hub entries, {mismatches} mismatches"
+    )
+    if mismatches:
+        sys.exit(f"FAILED: {mismatches} products did not match the brute-force volunteer set")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
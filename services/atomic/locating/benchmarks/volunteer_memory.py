@@ -0,0 +1,128 @@
+"""
+Memory and query cost of holding a volunteer roster in the locating service.
+Compares the per-object representations volunteers used to travel in (volunteerInfo
+messages, coordinate dicts, id -> tuple maps) against the columnar CoordinateStore and
+a full VolunteerIndex built on it. Run from services/atomic/locating:
+    python benchmarks/volunteer_memory.py [--volunteers 100000]
+
+"python heap" is measured with tracemalloc, which also sees NumPy buffers. Protobuf
+messages are allocated by the upb runtime outside the Python heap, so the resident set
+growth is reported next to it for every representation.
+"""
+import argparse
+import gc
+import os
+import sys
+import timeit
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import locate_pb2  # noqa: E402
+from coordinate_store import CoordinateStore  # noqa: E402
+from extra_functions import haversine_many  # noqa: E402
+from spatial_index import VolunteerIndex  # noqa: E402
+
+# Rough Singapore bounding box
+LAT_RANGE = (1.22, 1.47)
+LNG_RANGE = (103.60, 104.05)
+CENTER = (1.323104904706169, 103.9223963418113)
+
+
+def resident_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def measure(build):
+    gc.collect()
+    rss_before = resident_bytes()
+    tracemalloc.start()
+    structure = build()
+    heap, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return structure, heap, resident_bytes() - rss_before
+
+
+# Function to bring an index in line with a roster (parallel sequences of ids, lats and lngs),
+# touching only what changed; unchanged volunteers are compared column-wise
+def sync_index(index, volunteer_ids, lats, lngs):
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    with index.lock:
+        keep = set(volunteer_ids)
+        for volunteer_id in [v for v in index.store if v not in keep]:
+            index.remove(volunteer_id)
+        slots = np.fromiter(
+            (-1 if slot is None else slot for slot in map(index.store.slot, volunteer_ids)), dtype=np.int64, count=len(volunteer_ids)
+        )
+        known = slots >= 0
+        changed = ~known
+        changed[known] = (index.store.lats[slots[known]] != lats[known]) | (index.store.lngs[slots[known]] != lngs[known])
+        for k in np.flatnonzero(changed):
+            index.upsert(volunteer_ids[k], float(lats[k]), float(lngs[k]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--volunteers", type=int, default=100000)
+    parser.add_argument("--radius-km", type=float, default=2.0)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    n = args.volunteers
+    rng = np.random.default_rng(42)
+    ids = [f"volunteer-{k:07d}" for k in range(n)]
+    lat_column = rng.uniform(*LAT_RANGE, n)
+    lng_column = rng.uniform(*LNG_RANGE, n)
+
+    # Every representation gets its own float objects, as geocoding results would
+    def coordinates():
+        return zip(ids, lat_column.tolist(), lng_column.tolist())
+
+    def build_store():
+        store = CoordinateStore()
+        for volunteer_id, lat, lng in coordinates():
+            store.put(volunteer_id, lat, lng)
+        return store
+
+    def build_index():
+        index = VolunteerIndex()
+        sync_index(index, ids, lat_column.tolist(), lng_column.tolist())
+        return index
+
+    representations = [
+        ("volunteerInfo messages", lambda: [
+            locate_pb2.volunteerInfo(userId=volunteer_id, userAddress="", lat=lat, lng=lng)
+            for volunteer_id, lat, lng in coordinates()
+        ]),
+        ("(id, {lat, lng}) list", lambda: [(volunteer_id, {"lat": lat, "lng": lng}) for volunteer_id, lat, lng in coordinates()]),
+        ("id -> (lat, lng) dict", lambda: {volunteer_id: (lat, lng) for volunteer_id, lat, lng in coordinates()}),
+        ("CoordinateStore", build_store),
+        ("VolunteerIndex", build_index),
+    ]
+
+    print(f"{n} volunteers (ids excluded, they are shared by every representation)")
+    print(f"{'representation':<24} {'python heap':>12} {'bytes/vol':>10} {'rss growth':>12}")
+    structures = {}
+    for name, build in representations:
+        structures[name], heap, rss = measure(build)
+        print(f"{name:<24} {heap / 2**20:>10.1f}MB {heap / n:>10.1f} {rss / 2**20:>10.1f}MB")
+
+    index = structures["VolunteerIndex"]
+    tuples = structures["id -> (lat, lng) dict"]
+    lat, lng = CENTER
+    expected = index.within_radius(lat, lng, args.radius_km)
+    assert sorted(expected) == sorted(
+        volunteer_id for volunteer_id, distance in zip(tuples, haversine_many(lng, lat, lng_column, lat_column))
+        if distance < args.radius_km
+    )
+    query = min(timeit.repeat(lambda: index.within_radius(lat, lng, args.radius_km), number=1, repeat=args.repeat))
+    resync = min(timeit.repeat(lambda: sync_index(index, ids, lat_column, lng_column), number=1, repeat=3))
+    print(f"\n{args.radius_km}km radius query: {query * 1e3:.3f}ms ({len(expected)} matches)")
+    print(f"unchanged roster re-sync: {resync * 1e3:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
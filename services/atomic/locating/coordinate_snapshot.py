@@ -0,0 +1,157 @@
+"""
+Read-only, memory-mapped snapshot of registered volunteer coordinates.
+
+Worker processes share one snapshot file through the page cache instead of each
+holding its own copy. Records are sorted by grid cell, so a radius query is a few
+binary searches over the cell key column followed by one vectorised haversine pass
+over the matching slices; nothing is materialised per worker.
+
+Layout (little-endian, every section 8-byte aligned):
+    header     magic, version, count, cell_km, id blob length
+    keys       uint64[count]   grid cell of each record, sorted ascending
+    lats       float64[count]
+    lngs       float64[count]
+    hashes     uint64[count]   hash of the normalized address the record was geocoded from
+    by_id      int64[count]    rows in ascending order of their utf-8 user id
+    offsets    int64[count+1]  byte offsets of each user id in the id blob
+    ids        utf-8 user ids, concatenated
+
+Writers build a complete new file next to the old one and os.replace() it, so
+readers always see either the previous or the next snapshot, never a mix.
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from extra_functions import haversine_many
+
+MAGIC = b"LOCSNAP2"
+HEADER = struct.Struct("<8sQQdQ")
+KM_PER_DEGREE_LAT = 111.32
+CELL_OFFSET = 1 << 31
+
+
+def address_hash(normalized_address):
+    return int.from_bytes(hashlib.blake2b(normalized_address.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _cell_keys(lats, lngs, cell_km):
+    step = cell_km / KM_PER_DEGREE_LAT
+    i = np.floor(np.asarray(lats) / step).astype(np.int64) + CELL_OFFSET
+    j = np.floor(np.asarray(lngs) / step).astype(np.int64) + CELL_OFFSET
+    return (i.astype(np.uint64) << np.uint64(32)) | j.astype(np.uint64)
+
+
+# Function to atomically write a snapshot from a dict of user id -> (lat, lng, address hash)
+def write_snapshot(path, records, version, cell_km=1.0):
+    ids = list(records)
+    lats = np.array([records[user_id][0] for user_id in ids], dtype=np.float64)
+    lngs = np.array([records[user_id][1] for user_id in ids], dtype=np.float64)
+    hashes = np.array([records[user_id][2] for user_id in ids], dtype=np.uint64)
+    keys = _cell_keys(lats, lngs, cell_km)
+
+    order = np.argsort(keys, kind="stable")
+    keys, lats, lngs, hashes = keys[order], lats[order], lngs[order], hashes[order]
+    encoded_ids = [ids[k].encode("utf-8") for k in order]
+    by_id = np.array(sorted(range(len(encoded_ids)), key=encoded_ids.__getitem__), dtype=np.int64)
+    offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(encoded) for encoded in encoded_ids])
+    blob = b"".join(encoded_ids)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, version, len(ids), cell_km, len(blob)))
+        for column in (keys, lats, lngs, hashes, by_id, offsets):
+            f.write(column.tobytes())
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CoordinateSnapshot:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.version, self.count, self.cell_km, blob_length = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a coordinate snapshot in the current format")
+
+        offset = HEADER.size
+        self.keys, offset = self._column(np.uint64, self.count, offset)
+        self.lats, offset = self._column(np.float64, self.count, offset)
+        self.lngs, offset = self._column(np.float64, self.count, offset)
+        self.hashes, offset = self._column(np.uint64, self.count, offset)
+        self.by_id, offset = self._column(np.int64, self.count, offset)
+        self.offsets, offset = self._column(np.int64, self.count + 1, offset)
+        self._ids_start = offset
+        self.step = self.cell_km / KM_PER_DEGREE_LAT
+
+    def _column(self, dtype, count, offset):
+        column = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=offset)
+        return column, offset + column.nbytes
+
+    def __len__(self):
+        return self.count
+
+    def user_id(self, row):
+        return self._user_id_bytes(row).decode("utf-8")
+
+    def _user_id_bytes(self, row):
+        start, end = self.offsets[row], self.offsets[row + 1]
+        return self._mmap[self._ids_start + start:self._ids_start + end]
+
+    # Returns the row holding user_id, or None; a binary search over by_id, so only
+    # about log2(count) ids are read from the blob
+    def row_of(self, user_id):
+        target = user_id.encode("utf-8")
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._user_id_bytes(int(self.by_id[middle])) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self._user_id_bytes(int(self.by_id[low])) == target:
+            return int(self.by_id[low])
+        return None
+
+    # Returns a dict of user id -> (lat, lng, address hash); used by writers only
+    def to_dict(self):
+        return {
+            self.user_id(row): (float(self.lats[row]), float(self.lngs[row]), int(self.hashes[row]))
+            for row in range(self.count)
+        }
+
+    # Returns the ids of volunteers strictly within radius_km, nearest first
+    def within_radius(self, lat, lng, radius_km):
+        if self.count == 0:
+            return []
+        lat_cells = math.ceil(radius_km / (KM_PER_DEGREE_LAT * self.step))
+        lng_cells = math.ceil(radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6) * self.step))
+        center_i = math.floor(lat / self.step) + CELL_OFFSET
+        center_j = math.floor(lng / self.step) + CELL_OFFSET
+
+        # Each grid row of the search box is one contiguous run of keys
+        rows = np.arange(center_i - lat_cells, center_i + lat_cells + 1, dtype=np.uint64) << np.uint64(32)
+        low = np.searchsorted(self.keys, rows | np.uint64(center_j - lng_cells), side="left")
+        high = np.searchsorted(self.keys, rows | np.uint64(center_j + lng_cells), side="right")
+        candidates = np.concatenate([np.arange(start, end) for start, end in zip(low, high)])
+        if len(candidates) == 0:
+            return []
+
+        distances = haversine_many(lng, lat, self.lngs[candidates], self.lats[candidates])
+        within = np.flatnonzero(distances < radius_km)
+        within = within[np.argsort(distances[within], kind="stable")]
+        return [self.user_id(int(candidates[k])) for k in within]
+
+    # Snapshots keep no per-hub state; the cell-sorted layout already makes this cheap
+    def within_radius_near_hub(self, hub, lat, lng, radius_km):
+        return self.within_radius(lat, lng, radius_km)
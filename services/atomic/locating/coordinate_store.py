@@ -0,0 +1,85 @@
+import sys
+
+import numpy as np
+
+
+class CoordinateStore:
+    """
+    Columnar volunteer coordinates: one float64 lat column and one float64 lng column
+    indexed by slot, plus an interned id table mapping user ids to slots.
+    A volunteer costs 16 bytes of coordinates and one dict entry, instead of a dict or
+    tuple of boxed floats each, and candidate sets are gathered with a single fancy
+    index rather than one lookup per volunteer. Freed slots are reused; the columns
+    grow by doubling. Not thread safe, callers provide their own locking.
+    """
+
+    def __init__(self, capacity=1024):
+        self._slots = {}
+        self._ids = []
+        self._free = []
+        self.lats = np.empty(capacity, dtype=np.float64)
+        self.lngs = np.empty(capacity, dtype=np.float64)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, volunteer_id):
+        return volunteer_id in self._slots
+
+    def __iter__(self):
+        return iter(self._slots)
+
+    def slot(self, volunteer_id):
+        return self._slots.get(volunteer_id)
+
+    def ids_of(self, slots):
+        ids = self._ids
+        return [ids[slot] for slot in slots]
+
+    def get(self, volunteer_id):
+        slot = self._slots.get(volunteer_id)
+        if slot is None:
+            return None
+        return (float(self.lats[slot]), float(self.lngs[slot]))
+
+    # Store or move a volunteer, returns its slot
+    def put(self, volunteer_id, lat, lng):
+        slot = self._slots.get(volunteer_id)
+        if slot is None:
+            volunteer_id = sys.intern(volunteer_id)
+            if self._free:
+                slot = self._free.pop()
+                self._ids[slot] = volunteer_id
+            else:
+                slot = len(self._ids)
+                if slot == len(self.lats):
+                    self._grow()
+                self._ids.append(volunteer_id)
+            self._slots[volunteer_id] = slot
+        self.lats[slot] = lat
+        self.lngs[slot] = lng
+        return slot
+
+    # returns the freed slot, or None if the id was not stored
+    def discard(self, volunteer_id):
+        slot = self._slots.pop(volunteer_id, None)
+        if slot is not None:
+            self._ids[slot] = None
+            self._free.append(slot)
+        return slot
+
+    def clear(self):
+        self._slots.clear()
+        self._ids.clear()
+        self._free.clear()
+
+    def _grow(self):
+        capacity = max(2 * len(self.lats), 1024)
+        for name in ("lats", "lngs"):
+            column = np.empty(capacity, dtype=np.float64)
+            column[:len(self._ids)] = getattr(self, name)[:len(self._ids)]
+            setattr(self, name, column)
+
+    # Approximate bytes held by the columns and the id table (ids themselves excluded)
+    def nbytes(self):
+        return self.lats.nbytes + self.lngs.nbytes + sys.getsizeof(self._slots) + sys.getsizeof(self._ids) + sys.getsizeof(self._free)
@@ -1,24 +1,256 @@
 from invokes import invoke_http
+from geocode_cache import GeocodeCache
+from postal_geocoder import PostalGeocoder
+from singleflight import SingleFlight
+from address_normalizer import normalize_address
+from request_deadline import RequestCancelled
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from math import radians, cos, sin, asin, sqrt
+from concurrent import futures
+from contextlib import contextmanager
 import os
+import threading
+import time
+import logging
 import urllib.parse
+import requests
+import numpy as np
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
+# Point these at fake_maps_server.py to run locating without network access
+GEOCODE_BASE_URL = os.getenv("GEOCODE_BASE_URL", "https://maps.googleapis.com").rstrip("/")
+PLACES_BASE_URL = os.getenv("PLACES_BASE_URL", "https://places.googleapis.com").rstrip("/")
+
+# Concurrent geocoding settings
+GEOCODE_CONCURRENT = os.getenv("GEOCODE_CONCURRENT", "true").lower() == "true"
+GEOCODE_MAX_WORKERS = int(os.getenv("GEOCODE_MAX_WORKERS", "16"))
+GEOCODE_DEADLINE_SECONDS = float(os.getenv("GEOCODE_DEADLINE_SECONDS", "10"))
+GEOCODE_HTTP_TIMEOUT_SECONDS = float(os.getenv("GEOCODE_HTTP_TIMEOUT_SECONDS", "5"))
+# How often a waiting RPC checks whether its client is still there
+GEOCODE_POLL_SECONDS = float(os.getenv("GEOCODE_POLL_SECONDS", "0.05"))
+
+EARTH_RADIUS_KM = 6371
+
+# Radius around the product/hub midpoint that volunteers must fall within
+VOLUNTEER_RADIUS_KM = 2
+
+# Largest radius the K-nearest mode may widen its search to, unless the request sets one
+NEAREST_MAX_RADIUS_KM = float(os.getenv("NEAREST_MAX_RADIUS_KM", "5"))
+
+# Bounded pool shared by all RPCs, so total outbound geocoding never exceeds GEOCODE_MAX_WORKERS
+geocode_executor = futures.ThreadPoolExecutor(max_workers=GEOCODE_MAX_WORKERS, thread_name_prefix="geocode")
+
+# Shared HTTP session so geocoding calls reuse pooled keep-alive connections
+geocode_session = requests.Session()
+for scheme in ("https://", "http://"):
+    geocode_session.mount(scheme, requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=GEOCODE_MAX_WORKERS))
+
+# Shared by every geocoding path so hubs and volunteers are only looked up once
+geocode_cache = GeocodeCache()
+
+# Local postal code table, tried before the cache and Google
+postal_geocoder = PostalGeocoder()
+
+# Concurrent cache misses for the same address share one Geocoding API call
+geocode_flight = SingleFlight()
+
+# Set on a thread while cached_only() is active; see there
+_cached_only = threading.local()
+
+# Function to run a pipeline step with geocoding limited to the postal table and cache
+# used by the aio server, which has already awaited every lookup the RPC needs; what is still
+# missing failed, and addresses whose normalized key is in skipped_keys ran out of time
+@contextmanager
+def cached_only(skipped_keys):
+    _cached_only.skipped = skipped_keys
+    try:
+        yield
+    finally:
+        del _cached_only.skipped
 
 # Function to convert product address to coords
 # returns product coordinate dict
 def convertAddress(address):
-    coordinate = None
-    encoded_address = urllib.parse.quote(address)
-    formatted_url = f"https://maps.googleapis.com/maps/api/geocode/json?address={encoded_address}&key={GOOGLE_MAPS_API_KEY}"
-    result = invoke_http(formatted_url)
+    # Spelling variants of one place share a key, so they share cache entries and in-flight calls
+    key = normalize_address(address)
+    coordinate = postal_geocoder.geocode(key)
+    if coordinate is not None:
+        return coordinate
+    coordinate = geocode_cache.get(key)
+    if coordinate is not None:
+        return coordinate
+    return _geocode_uncached(key, address)
+
+# Function to geocode an address the postal table and cache could not answer
+# concurrent callers for the same key share one Geocoding API call
+def _geocode_uncached(key, address):
+    if getattr(_cached_only, "skipped", None) is not None:
+        return None
+    return geocode_flight.do(key, lambda: _geocode_and_cache(key, address))
+
+def _geocode_and_cache(key, address):
+    # Another flight may have filled the cache between our miss and becoming leader
+    coordinate = geocode_cache.get(key, count=False)
+    if coordinate is None:
+        coordinate = geocode_address(address)
+        geocode_cache.put(key, coordinate)
+    return coordinate
+
+# Function to call the Google Geocoding API directly, bypassing the cache
+def geocode_address(address):
+    result = invoke_http(geocode_url(address), session=geocode_session, timeout=GEOCODE_HTTP_TIMEOUT_SECONDS)
     coordinate = result["results"][0]["geometry"]["location"]
     return coordinate
 
+def geocode_url(address):
+    encoded_address = urllib.parse.quote(address)
+    return f"{GEOCODE_BASE_URL}/maps/api/geocode/json?address={encoded_address}&key={GOOGLE_MAPS_API_KEY}"
+
+# Function to geocode many addresses, concurrently unless GEOCODE_CONCURRENT is off
+# postal table and cache hits are answered inline; only the misses go to the geocoding pool
+# and count against the deadlines
+# request_deadline (request_deadline.RequestDeadline) bounds the work by the client's gRPC deadline:
+# addresses not done in time, by that deadline or by deadline_seconds, are skipped and the request is
+# flagged as truncated (unless mark_truncated is off), and RequestCancelled is raised (with the queued
+# lookups cancelled) as soon as the client goes away
+# returns dict of address -> coordinate dict, None for addresses that failed or missed the deadline
+def convert_addresses(addresses, deadline_seconds=GEOCODE_DEADLINE_SECONDS, request_deadline=None, mark_truncated=True):
+    # Geocode one spelling per normalized address and share the answer with the others
+    spellings_by_key = {}
+    for address in dict.fromkeys(addresses):
+        spellings_by_key.setdefault(normalize_address(address), []).append(address)
+    coordinates, misses = resolve_locally(spellings_by_key)
+    if not misses:
+        return _expand_spellings(coordinates, spellings_by_key)
+
+    skipped_keys = getattr(_cached_only, "skipped", None)
+    if skipped_keys is not None:
+        if request_deadline is not None and mark_truncated and any(key in skipped_keys for key, _ in misses):
+            request_deadline.truncated = True
+        for _, address in misses:
+            coordinates[address] = None
+        return _expand_spellings(coordinates, spellings_by_key)
+
+    if not GEOCODE_CONCURRENT:
+        for key, address in misses:
+            if request_deadline is not None and not _within_deadline(request_deadline):
+                coordinates[address] = None
+                continue
+            coordinates[address] = _try_geocode_uncached(key, address)
+        return _expand_spellings(coordinates, spellings_by_key)
+
+    deadline = time.monotonic() + deadline_seconds
+    pending = {geocode_executor.submit(_geocode_uncached, key, address): address for key, address in misses}
+    done = set()
+    not_done = set(pending)
+    while not_done:
+        timeout = deadline - time.monotonic()
+        if request_deadline is not None:
+            if request_deadline.cancelled():
+                for future in not_done:
+                    future.cancel()
+                raise RequestCancelled(f"client cancelled with {len(not_done)} of {len(pending)} addresses outstanding")
+            client_remaining = request_deadline.remaining()
+            if client_remaining is not None:
+                timeout = min(timeout, client_remaining)
+            timeout = min(timeout, GEOCODE_POLL_SECONDS)
+        if timeout <= 0:
+            break
+        finished, not_done = futures.wait(not_done, timeout=timeout)
+        done |= finished
+
+    for future in done:
+        address = pending[future]
+        try:
+            coordinates[address] = future.result()
+        except Exception as e:
+            logger.warning(f"Geocoding failed for {address}: {str(e)}")
+            coordinates[address] = None
+
+    if not_done:
+        # Whichever deadline cut geocoding short, the answer no longer covers every address
+        if request_deadline is not None and mark_truncated:
+            request_deadline.truncated = True
+        if request_deadline is not None and request_deadline.expired():
+            logger.warning(f"Client deadline reached, {len(not_done)} of {len(pending)} addresses skipped")
+        else:
+            logger.warning(f"Geocoding deadline of {deadline_seconds}s hit, {len(not_done)} of {len(pending)} addresses skipped")
+        for future in not_done:
+            future.cancel()
+            coordinates[pending[future]] = None
+
+    return _expand_spellings(coordinates, spellings_by_key)
+
+# Sequential path: stop on cancellation, skip the rest once the client deadline is reached
+def _within_deadline(request_deadline):
+    if request_deadline.cancelled():
+        raise RequestCancelled("client cancelled the request")
+    if request_deadline.expired():
+        request_deadline.truncated = True
+        return False
+    return True
+
+def _expand_spellings(coordinates, spellings_by_key):
+    expanded = {}
+    for spellings in spellings_by_key.values():
+        for address in spellings:
+            expanded[address] = coordinates[spellings[0]]
+    return expanded
+
+# Function to answer normalized addresses from the postal table, then the cache in one batched lookup
+# returns (dict of address -> coordinate for the hits, list of (key, address) still to geocode)
+def resolve_locally(spellings_by_key):
+    coordinates = {}
+    remaining = []
+    for key, spellings in spellings_by_key.items():
+        coordinate = postal_geocoder.geocode(key)
+        if coordinate is not None:
+            coordinates[spellings[0]] = coordinate
+        else:
+            remaining.append(key)
+    cached = geocode_cache.get_many(remaining)
+    misses = []
+    for key in remaining:
+        address = spellings_by_key[key][0]
+        if key in cached:
+            coordinates[address] = cached[key]
+        else:
+            misses.append((key, address))
+    return coordinates, misses
+
+def _try_geocode_uncached(key, address):
+    try:
+        return _geocode_uncached(key, address)
+    except Exception as e:
+        logger.warning(f"Geocoding failed for {address}: {str(e)}")
+        return None
+
+# Function to get the coordinates carried on a volunteerInfo/hubInfo message, if any
+# returns coordinate dict, or None when lat/lng were not both set
+def message_coordinate(message):
+    if message.HasField("lat") and message.HasField("lng"):
+        return {"lat": message.lat, "lng": message.lng}
+    return None
+
+# Function to resolve coordinates for volunteerInfo/hubInfo messages, geocoding only those without lat/lng
+# returns a list of coordinate dicts (None where geocoding failed) aligned with messages
+def resolve_coordinates(messages, address_of, request_deadline=None):
+    known = [message_coordinate(message) for message in messages]
+    geocoded = convert_addresses(
+        [address_of(message) for message, coords in zip(messages, known) if coords is None],
+        request_deadline=request_deadline,
+    )
+    return [coords if coords is not None else geocoded[address_of(message)] for message, coords in zip(messages, known)]
+
+# Function to expose geocode cache, postal table and single-flight counters
+def geocode_cache_stats():
+    return dict(geocode_cache.stats(), postal=postal_geocoder.stats(), singleFlight=geocode_flight.stats())
+
 # Function to find the closest community center coords w/ prod coords
 # returns cc coordinate dict
 def find_closest_cc(product_coords):
@@ -38,7 +270,7 @@ def find_closest_cc(product_coords):
             }
         }
     }
-    url = "https://places.googleapis.com/v1/places:searchNearby"
+    url = f"{PLACES_BASE_URL}/v1/places:searchNearby"
     places_list = invoke_http(url,'POST',body,headers=headers)
 
     res = None
@@ -70,33 +302,79 @@ def get_center_point(product_coord,cc_coord):
     return center_point_coordinate
 
 # Function to find the closest users in a 2km radius w/ userList and midpoint
-def find_closest_users(center_coord, user_list):
-    res = []
-    for user in user_list:
-        user_address = user.userAddress
-        user_coords = convertAddress(user_address)
-        distance_difference = haversine(center_coord["longitude"],center_coord["latitude"],user_coords["lng"],user_coords["lat"])
-        if distance_difference<2:
-            res.append(user.userId)
-    return res
+# the roster arrives with each request, so one vectorised haversine_many scan beats
+# indexing it first; the grid (spatial_index.VolunteerIndex) is kept for resident volunteers
+# geocoding stops at request_deadline (request_deadline.RequestDeadline) when given
+# max_volunteers > 0 returns the K nearest within the match_users radius cap
+def find_closest_users(center_coord, user_list, request_deadline=None, max_volunteers=0, max_radius_km=0):
+    user_coords_list = resolve_coordinates(user_list, lambda user: user.userAddress, request_deadline)
+    located_users = [(user.userId, coords) for user, coords in zip(user_list, user_coords_list) if coords is not None]
+    user_ids = [user_id for user_id, _ in located_users]
+    lats = [coords["lat"] for _, coords in located_users]
+    lngs = [coords["lng"] for _, coords in located_users]
+    lat, lng = center_coord["latitude"], center_coord["longitude"]
+
+    if not located_users:
+        return []
+    distances = haversine_many(lng, lat, lngs, lats)
+    if max_volunteers <= 0:
+        within = np.flatnonzero(distances < VOLUNTEER_RADIUS_KM)
+        return [user_ids[k] for k in within[np.argsort(distances[within], kind="stable")]]
+
+    # Every distance is already known, so take the K nearest inside the cap directly
+    within = np.flatnonzero(distances < (max_radius_km if max_radius_km > 0 else NEAREST_MAX_RADIUS_KM))
+    if len(within) > max_volunteers:
+        within = within[np.argpartition(distances[within], max_volunteers - 1)[:max_volunteers]]
+    within = within[np.argsort(distances[within], kind="stable")]
+    return [user_ids[k] for k in within]
+
+# Function to pick the volunteers to notify, given within_radius(radius_km) returning ids nearest first
+# max_volunteers <= 0 keeps the fixed VOLUNTEER_RADIUS_KM radius; otherwise returns the max_volunteers
+# nearest within max_radius_km (NEAREST_MAX_RADIUS_KM when unset), searching from VOLUNTEER_RADIUS_KM
+# and doubling the radius only while too few volunteers have been found
+def match_users(within_radius, max_volunteers=0, max_radius_km=0):
+    if max_volunteers <= 0:
+        return within_radius(VOLUNTEER_RADIUS_KM)
+
+    max_radius_km = max_radius_km if max_radius_km > 0 else NEAREST_MAX_RADIUS_KM
+    radius_km = min(VOLUNTEER_RADIUS_KM, max_radius_km)
+    while True:
+        matches = within_radius(radius_km)
+        if len(matches) >= max_volunteers or radius_km >= max_radius_km:
+            return matches[:max_volunteers]
+        radius_km = min(radius_km * 2, max_radius_km)
 
 # Find the hub closest to the product address
-def get_closest_hub(hub_list, product_coords):
+# uses catchment_cache (hub_catchment.HubCatchmentCache) for an O(1) lookup when given
+def get_closest_hub(hub_list, product_coords, catchment_cache=None):
     closest_hub = {}
-    for hub in hub_list:
-        hub_address = hub.hubAddress
-        hub_coords = convertAddress(hub_address)
-        dist_to_product = haversine(hub_coords["lng"],hub_coords["lat"],product_coords["lng"],product_coords["lat"])
-
-        hub_res = {
-            "hubID": hub.hubID,
-            "hubName": hub.hubName,
-            "hubAddress": hub.hubAddress,
-            "distToProduct": dist_to_product
-        }
+    if catchment_cache is not None:
+        hub, dist_to_product = catchment_cache.get(hub_list).closest(product_coords["lat"], product_coords["lng"])
+        if hub is not None:
+            closest_hub = dict(hub, distToProduct=dist_to_product)
+        return closest_hub
+
+    hub_coords_list = resolve_coordinates(hub_list, lambda hub: hub.hubAddress)
+    located_hubs = [(hub, coords) for hub, coords in zip(hub_list, hub_coords_list) if coords is not None]
+    if not located_hubs:
+        return closest_hub
 
-        if closest_hub == {} or (dist_to_product < closest_hub["distToProduct"]):
-            closest_hub = hub_res
+    distances = haversine_many(
+        product_coords["lng"],
+        product_coords["lat"],
+        [coords["lng"] for _, coords in located_hubs],
+        [coords["lat"] for _, coords in located_hubs],
+    )
+    closest_index = int(np.argmin(distances))
+    hub, hub_coords = located_hubs[closest_index]
+    closest_hub = {
+        "hubID": hub.hubID,
+        "hubName": hub.hubName,
+        "hubAddress": hub.hubAddress,
+        "lat": hub_coords["lat"],
+        "lng": hub_coords["lng"],
+        "distToProduct": float(distances[closest_index])
+    }
     print(closest_hub)
     return closest_hub
 
@@ -116,6 +394,35 @@ def haversine(lon1, lat1, lon2, lat2):
     r = 6371 # Radius of earth in kilometers. Use 3956 for miles. Determines return value units.
     return c * r
 
+def haversine_many(lon, lat, lons, lats):
+    """
+    Vectorised haversine: distances in kilometers from one point to N points.
+    lons and lats are sequences (or NumPy arrays) of decimal degrees; returns an array of N.
+    """
+    lon, lat = np.radians(lon), np.radians(lat)
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+
+    dlon = lons - lon
+    dlat = lats - lat
+    a = np.sin(dlat/2)**2 + np.cos(lat) * np.cos(lats) * np.sin(dlon/2)**2
+    return 2 * np.arcsin(np.sqrt(a)) * EARTH_RADIUS_KM
+
+def haversine_matrix(lons1, lats1, lons2, lats2):
+    """
+    Vectorised haversine: N x M matrix of distances in kilometers between
+    the N points (lons1, lats1) and the M points (lons2, lats2).
+    """
+    lons1 = np.radians(np.asarray(lons1, dtype=np.float64))[:, np.newaxis]
+    lats1 = np.radians(np.asarray(lats1, dtype=np.float64))[:, np.newaxis]
+    lons2 = np.radians(np.asarray(lons2, dtype=np.float64))[np.newaxis, :]
+    lats2 = np.radians(np.asarray(lats2, dtype=np.float64))[np.newaxis, :]
+
+    dlon = lons2 - lons1
+    dlat = lats2 - lats1
+    a = np.sin(dlat/2)**2 + np.cos(lats1) * np.cos(lats2) * np.sin(dlon/2)**2
+    return 2 * np.arcsin(np.sqrt(a)) * EARTH_RADIUS_KM
+
 # hub_list =     [
 #         {
 #             "hubID": 6,
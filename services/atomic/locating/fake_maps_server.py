@@ -0,0 +1,153 @@
+"""
+Local stand-in for the Google Geocoding and Places APIs used by locating.
+Answers are deterministic: addresses with a postal code are placed with
+postal_geocoder.synthetic_coordinate, anything else is hashed onto the island, so the
+same address always lands on the same spot. Latency can be injected per request.
+
+Point locating at it with:
+    GEOCODE_BASE_URL=http://localhost:8765 PLACES_BASE_URL=http://localhost:8765 python locating.py
+
+Run from services/atomic/locating:
+    python fake_maps_server.py [--port 8765] [--latency-ms 80] [--jitter-ms 20]
+
+GET /stats returns request counters; POST /stats/reset clears them.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from address_normalizer import normalize_address
+from postal_geocoder import SYNTHETIC_LAT_RANGE, SYNTHETIC_LNG_RANGE, extract_postal_code, synthetic_coordinate
+
+
+# Function to place any address deterministically inside Singapore
+# returns coordinate dict, or None for a blank address
+def fake_coordinate(address):
+    key = normalize_address(address)
+    if not key:
+        return None
+    postal_code = extract_postal_code(key)
+    if postal_code is not None:
+        return synthetic_coordinate(postal_code)
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    lat_fraction = int.from_bytes(digest[:4], "little") / 2**32
+    lng_fraction = int.from_bytes(digest[4:], "little") / 2**32
+    return {
+        "lat": SYNTHETIC_LAT_RANGE[0] + lat_fraction * (SYNTHETIC_LAT_RANGE[1] - SYNTHETIC_LAT_RANGE[0]),
+        "lng": SYNTHETIC_LNG_RANGE[0] + lng_fraction * (SYNTHETIC_LNG_RANGE[1] - SYNTHETIC_LNG_RANGE[0]),
+    }
+
+
+class FakeMapsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=0.0, jitter_ms=0.0, seed=0):
+        super().__init__(address, FakeMapsHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = {}
+
+    def delay(self):
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        seconds = max(0.0, self.latency_ms + jitter) / 1000
+        if seconds:
+            time.sleep(seconds)
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts)
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+
+
+class FakeMapsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == "/maps/api/geocode/json":
+            self.server.count("geocode")
+            self.server.delay()
+            address = urllib.parse.parse_qs(url.query).get("address", [""])[0]
+            coordinate = fake_coordinate(address)
+            if coordinate is None:
+                return self._send(200, {"status": "ZERO_RESULTS", "results": []})
+            return self._send(200, {
+                "status": "OK",
+                "results": [{"formatted_address": normalize_address(address), "geometry": {"location": coordinate}}],
+            })
+        if url.path == "/stats":
+            return self._send(200, self.server.stats())
+        self._send(404, {"error": f"unknown path {url.path}"})
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == "/v1/places:searchNearby":
+            self.server.count("places")
+            self.server.delay()
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            center = body.get("locationRestriction", {}).get("circle", {}).get("center", {})
+            lat, lng = center.get("latitude", 0.0), center.get("longitude", 0.0)
+            # One community club a few hundred metres north-east of the search center
+            return self._send(200, {"places": [{
+                "displayName": {"text": "Synthetic Community Club"},
+                "formattedAddress": f"{lat + 0.002:.6f}, {lng + 0.002:.6f}",
+                "location": {"latitude": lat + 0.002, "longitude": lng + 0.002},
+            }]})
+        if url.path == "/stats/reset":
+            self.server.reset()
+            return self._send(200, {})
+        self._send(404, {"error": f"unknown path {url.path}"})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Keep load runs quiet
+    def log_message(self, format, *args):
+        pass
+
+
+# Function to run the fake server on a background thread, e.g. inside a benchmark
+# returns the server; its base URL is http://host:server.server_port
+def start_server(host="127.0.0.1", port=0, latency_ms=0.0, jitter_ms=0.0, seed=0):
+    server = FakeMapsServer((host, port), latency_ms, jitter_ms, seed)
+    threading.Thread(target=server.serve_forever, name="fake-maps", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every geocode/places call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform +/- jitter around the latency")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the jitter sequence")
+    args = parser.parse_args()
+
+    server = FakeMapsServer((args.host, args.port), args.latency_ms, args.jitter_ms, args.seed)
+    print(f"Fake maps server on http://{args.host}:{args.port} (latency {args.latency_ms}ms +/- {args.jitter_ms}ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
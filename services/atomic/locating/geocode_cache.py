@@ -0,0 +1,193 @@
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", "geocode_cache.sqlite3")
+GEOCODE_CACHE_MAX_ENTRIES = int(os.getenv("GEOCODE_CACHE_MAX_ENTRIES", "50000"))
+GEOCODE_CACHE_TTL_SECONDS = int(os.getenv("GEOCODE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+# Rows allowed past max_entries before an eviction pass trims back to max_entries (0 = 5% of max)
+GEOCODE_CACHE_EVICT_SLACK = int(os.getenv("GEOCODE_CACHE_EVICT_SLACK", "0"))
+# Cache hits record their access time in memory and write them in one batch this often
+GEOCODE_CACHE_ACCESS_FLUSH_SECONDS = float(os.getenv("GEOCODE_CACHE_ACCESS_FLUSH_SECONDS", "5"))
+GEOCODE_CACHE_ACCESS_FLUSH_ROWS = int(os.getenv("GEOCODE_CACHE_ACCESS_FLUSH_ROWS", "1000"))
+# Expired rows are also swept this often, so they don't wait for the table to fill up
+GEOCODE_CACHE_EXPIRE_INTERVAL_SECONDS = float(os.getenv("GEOCODE_CACHE_EXPIRE_INTERVAL_SECONDS", "3600"))
+# Addresses per SELECT in get_many, below SQLite's bound-parameter limit
+GEOCODE_CACHE_BATCH_ROWS = 500
+
+
+class GeocodeCache:
+    """
+    Persistent address -> coordinate cache backed by SQLite.
+    Entries expire after ttl_seconds and the least recently used entries
+    are evicted once the table grows past max_entries.
+    The row count is tracked in memory, so a put is one INSERT; eviction runs in a
+    batch once the table is evict_slack rows over the limit. Hits buffer their
+    access times and flush them together instead of committing on every lookup.
+    """
+
+    def __init__(self, path=GEOCODE_CACHE_PATH, max_entries=GEOCODE_CACHE_MAX_ENTRIES, ttl_seconds=GEOCODE_CACHE_TTL_SECONDS,
+                 evict_slack=GEOCODE_CACHE_EVICT_SLACK, access_flush_seconds=GEOCODE_CACHE_ACCESS_FLUSH_SECONDS,
+                 access_flush_rows=GEOCODE_CACHE_ACCESS_FLUSH_ROWS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evict_slack = evict_slack or max(1, max_entries // 20)
+        self.access_flush_seconds = access_flush_seconds
+        self.access_flush_rows = access_flush_rows
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # One connection shared by the gRPC worker threads, guarded by _lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS geocode (
+                address TEXT PRIMARY KEY,
+                lat REAL NOT NULL,
+                lng REAL NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS geocode_accessed_at ON geocode (accessed_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS geocode_created_at ON geocode (created_at)")
+        self._conn.commit()
+        # Approximate: other worker processes share the file, so it is re-counted at each eviction pass
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM geocode").fetchone()
+        # address -> last access time not yet written to the table
+        self._pending_access = {}
+        self._access_flushed_at = time.monotonic()
+        self._expired_at = time.monotonic()
+
+    # Returns the cached coordinate dict, or None on a miss / expired entry
+    # count=False skips the hit/miss counters for internal re-checks
+    def get(self, address, count=True):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT lat, lng, created_at FROM geocode WHERE address = ?", (address,)
+            ).fetchone()
+            if row is None:
+                if count:
+                    self.misses += 1
+                return None
+            lat, lng, created_at = row
+            if now - created_at > self.ttl_seconds:
+                # Left for the put that refreshes it or the next expiry sweep
+                if count:
+                    self.misses += 1
+                return None
+            self._pending_access[address] = now
+            if (len(self._pending_access) >= self.access_flush_rows
+                    or time.monotonic() - self._access_flushed_at >= self.access_flush_seconds):
+                self._flush_access()
+                self._conn.commit()
+            if count:
+                self.hits += 1
+        return {"lat": lat, "lng": lng}
+
+    # Returns a dict of address -> coordinate dict for the addresses that hit, looked up
+    # with one SELECT per GEOCODE_CACHE_BATCH_ROWS addresses instead of one per address
+    def get_many(self, addresses):
+        now = time.time()
+        found = {}
+        with self._lock:
+            for start in range(0, len(addresses), GEOCODE_CACHE_BATCH_ROWS):
+                batch = addresses[start:start + GEOCODE_CACHE_BATCH_ROWS]
+                rows = self._conn.execute(
+                    f"SELECT address, lat, lng, created_at FROM geocode WHERE address IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for address, lat, lng, created_at in rows:
+                    if now - created_at <= self.ttl_seconds:
+                        found[address] = {"lat": lat, "lng": lng}
+                        self._pending_access[address] = now
+            self.hits += len(found)
+            self.misses += len(set(addresses)) - len(found)
+            if (len(self._pending_access) >= self.access_flush_rows
+                    or time.monotonic() - self._access_flushed_at >= self.access_flush_seconds):
+                self._flush_access()
+                self._conn.commit()
+        return found
+
+    def put(self, address, coordinate):
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO geocode (address, lat, lng, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (address, coordinate["lat"], coordinate["lng"], now, now),
+            )
+            if cursor.rowcount:
+                self._count += 1
+            else:
+                self._conn.execute(
+                    "UPDATE geocode SET lat = ?, lng = ?, created_at = ?, accessed_at = ? WHERE address = ?",
+                    (coordinate["lat"], coordinate["lng"], now, now, address),
+                )
+            self._maybe_evict()
+            self._conn.commit()
+
+    # Write the buffered access times of cache hits in one statement
+    def _flush_access(self):
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE geocode SET accessed_at = ? WHERE address = ?",
+                [(accessed_at, address) for address, accessed_at in self._pending_access.items()],
+            )
+            self._pending_access.clear()
+        self._access_flushed_at = time.monotonic()
+
+    def _maybe_evict(self):
+        if (self._count > self.max_entries + self.evict_slack
+                or time.monotonic() - self._expired_at >= GEOCODE_CACHE_EXPIRE_INTERVAL_SECONDS):
+            self._evict()
+
+    # Drop expired rows first, then the least recently used rows above max_entries
+    def _evict(self):
+        self._flush_access()
+        cutoff = time.time() - self.ttl_seconds
+        self._conn.execute("DELETE FROM geocode WHERE created_at < ?", (cutoff,))
+        self._expired_at = time.monotonic()
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM geocode").fetchone()
+        overflow = self._count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM geocode WHERE address IN (SELECT address FROM geocode ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,),
+            )
+            self._count -= overflow
+            self.evictions += overflow
+
+    # Write out buffered access times, e.g. before shutdown
+    def flush(self):
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM geocode")
+            self._conn.commit()
+            self._count = 0
+            self._pending_access.clear()
+
+    def stats(self):
+        with self._lock:
+            size = self._count
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": size,
+            "hitRate": (self.hits / lookups) if lookups else 0.0,
+        }
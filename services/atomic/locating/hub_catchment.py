@@ -0,0 +1,132 @@
+import math
+import threading
+import logging
+
+import numpy as np
+
+import extra_functions
+from address_normalizer import normalize_address
+from extra_functions import haversine, haversine_many, haversine_matrix
+
+logger = logging.getLogger(__name__)
+
+KM_PER_DEGREE_LAT = 111.32
+MAX_CELLS = 250000
+
+
+class HubCatchment:
+    """
+    Grid lookup table answering "which hub is closest to this point".
+    Every cell over the hubs' bounding box (plus a margin) stores the few hubs that can
+    be nearest to some point inside it, so a lookup is one dict access and, near
+    catchment boundaries, a distance check against two or three hubs. Points outside
+    the table fall back to a scan over all hubs.
+    """
+
+    def __init__(self, hubs, cell_km=0.5, margin_km=10.0):
+        # hubs: list of dicts with hubID, hubName, hubAddress, lat, lng
+        self.hubs = list(hubs)
+        self.lats = np.array([hub["lat"] for hub in self.hubs], dtype=np.float64)
+        self.lngs = np.array([hub["lng"] for hub in self.hubs], dtype=np.float64)
+        self.table = {}
+        if self.hubs:
+            self._build(cell_km, margin_km)
+
+    def _build(self, cell_km, margin_km):
+        mid_lat = float(self.lats.mean())
+        margin_lat = margin_km / KM_PER_DEGREE_LAT
+        margin_lng = margin_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(mid_lat)), 1e-6))
+        min_lat, max_lat = self.lats.min() - margin_lat, self.lats.max() + margin_lat
+        min_lng, max_lng = self.lngs.min() - margin_lng, self.lngs.max() + margin_lng
+
+        # Grow the cells until the table fits in MAX_CELLS
+        while True:
+            self.lat_step = cell_km / KM_PER_DEGREE_LAT
+            self.lng_step = cell_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(mid_lat)), 1e-6))
+            self.i_range = (math.floor(min_lat / self.lat_step), math.floor(max_lat / self.lat_step))
+            self.j_range = (math.floor(min_lng / self.lng_step), math.floor(max_lng / self.lng_step))
+            rows = self.i_range[1] - self.i_range[0] + 1
+            cols = self.j_range[1] - self.j_range[0] + 1
+            if rows * cols <= MAX_CELLS:
+                break
+            cell_km *= 2
+
+        cell_i, cell_j = np.meshgrid(
+            np.arange(self.i_range[0], self.i_range[1] + 1),
+            np.arange(self.j_range[0], self.j_range[1] + 1),
+            indexing="ij",
+        )
+        cell_i, cell_j = cell_i.ravel(), cell_j.ravel()
+        center_lats = (cell_i + 0.5) * self.lat_step
+        center_lngs = (cell_j + 0.5) * self.lng_step
+
+        # Any point in a cell is within half_diagonal of its center, so a hub can only be the
+        # nearest for some point in the cell if it is within min distance + 2 * half_diagonal
+        half_diagonal = 0.5 * math.hypot(self.lat_step * KM_PER_DEGREE_LAT, self.lng_step * KM_PER_DEGREE_LAT)
+        distances = haversine_matrix(center_lngs, center_lats, self.lngs, self.lats)
+        candidates = distances <= distances.min(axis=1)[:, np.newaxis] + 2 * half_diagonal
+
+        for i, j, row in zip(cell_i.tolist(), cell_j.tolist(), candidates):
+            self.table[(i, j)] = tuple(np.flatnonzero(row).tolist())
+
+        ambiguous = sum(1 for hub_indexes in self.table.values() if len(hub_indexes) > 1)
+        logger.info(f"Built hub catchment for {len(self.hubs)} hubs: {len(self.table)} cells of {cell_km}km, {ambiguous} on boundaries")
+
+    # Returns (hub dict, distance in km) for the hub closest to the point, or (None, None) with no hubs
+    def closest(self, lat, lng):
+        if not self.hubs:
+            return None, None
+        hub_indexes = self.table.get((math.floor(lat / self.lat_step), math.floor(lng / self.lng_step)))
+        if hub_indexes is None:
+            hub_indexes = range(len(self.hubs))
+        if len(hub_indexes) == 1:
+            index = hub_indexes[0]
+            hub = self.hubs[index]
+            return hub, haversine(lng, lat, hub["lng"], hub["lat"])
+        hub_indexes = np.asarray(hub_indexes)
+        distances = haversine_many(lng, lat, self.lngs[hub_indexes], self.lats[hub_indexes])
+        best = int(np.argmin(distances))
+        return self.hubs[int(hub_indexes[best])], float(distances[best])
+
+
+class HubCatchmentCache:
+    """
+    Holds the HubCatchment for the most recent hub list and rebuilds it only when
+    the hubs passed in (IDs, names, normalized addresses or coordinates) change.
+    """
+
+    def __init__(self, cell_km=0.5):
+        self.cell_km = cell_km
+        self._signature = None
+        self._catchment = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def signature(hub_list):
+        signature = []
+        for hub in hub_list:
+            coords = extra_functions.message_coordinate(hub)
+            signature.append((hub.hubID, hub.hubName, normalize_address(hub.hubAddress), None if coords is None else (coords["lat"], coords["lng"])))
+        return tuple(signature)
+
+    def get(self, hub_list):
+        signature = self.signature(hub_list)
+        with self._lock:
+            if signature == self._signature:
+                return self._catchment
+
+        # Geocode and build outside the lock so other requests are not held up behind the
+        # network; concurrent misses for the same hubs each build and the last one is kept
+        coords_list = extra_functions.resolve_coordinates(hub_list, lambda hub: hub.hubAddress)
+        hubs = [
+            {"hubID": hub.hubID, "hubName": hub.hubName, "hubAddress": hub.hubAddress, "lat": coords["lat"], "lng": coords["lng"]}
+            for hub, coords in zip(hub_list, coords_list)
+            if coords is not None
+        ]
+        catchment = HubCatchment(hubs, cell_km=self.cell_km)
+        # Hubs that failed to geocode are retried on the next call instead of being cached out
+        if len(hubs) == len(hub_list):
+            with self._lock:
+                self._signature = signature
+                self._catchment = catchment
+        return catchment
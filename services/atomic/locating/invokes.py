@@ -4,11 +4,12 @@ SUPPORTED_HTTP_METHODS = set([
     "GET", "OPTIONS", "HEAD", "POST", "PUT", "PATCH", "DELETE"
 ])
 
-def invoke_http(url, method='GET', json=None, **kwargs):
+def invoke_http(url, method='GET', json=None, session=None, **kwargs):
     """A simple wrapper for requests methods.
        url: the url of the http service;
        method: the http method;
        data: the JSON input when needed by the http method;
+       session: optional requests.Session to reuse pooled connections;
        return: the JSON reply content from the http service if the call succeeds;
             otherwise, return a JSON object with a "code" name-value pair.
     """
@@ -17,7 +18,7 @@ def invoke_http(url, method='GET', json=None, **kwargs):
 
     try:
         if method.upper() in SUPPORTED_HTTP_METHODS:
-            r = requests.request(method, url, json = json, **kwargs)
+            r = (session or requests).request(method, url, json = json, **kwargs)
         else:
             raise Exception("HTTP method {} unsupported.".format(method))
     except Exception as e:
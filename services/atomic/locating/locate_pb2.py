@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0clocate.proto\"4\n\rvolunteerInfo\x12\x0e\n\x06userId\x18\x01 \x01(\t\x12\x13\n\x0buserAddress\x18\x02 \x01(\t\"=\n\x07hubInfo\x12\r\n\x05hubID\x18\x01 \x01(\x05\x12\x0f\n\x07hubName\x18\x02 \x01(\t\x12\x12\n\nhubAddress\x18\x03 \x01(\t\"\x90\x01\n\tinputBody\x12\x11\n\tproductId\x18\x01 \x01(\t\x12\x16\n\x0eproductAddress\x18\x02 \x01(\t\x12\x19\n\x11productHubAddress\x18\x03 \x01(\t\x12%\n\rvolunteerList\x18\x04 \x03(\x0b\x32\x0e.volunteerInfo\x12\x16\n\x04hubs\x18\x05 \x03(\x0b\x32\x08.hubInfo\"`\n\x0cresponseBody\x12\x11\n\tproductId\x18\x01 \x01(\t\x12\x10\n\x08userList\x18\x02 \x03(\t\x12\r\n\x05\x65rror\x18\x03 \x01(\t\x12\x1c\n\nclosestHub\x18\x04 \x01(\x0b\x32\x08.hubInfo29\n\x06locate\x12/\n\x10getFilteredUsers\x12\n.inputBody\x1a\r.responseBody\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0clocate.proto\"h\n\rvolunteerInfo\x12\x0e\n\x06userId\x18\x01 \x01(\t\x12\x13\n\x0buserAddress\x18\x02 \x01(\t\x12\x10\n\x03lat\x18\x03 \x01(\x01H\x00\x88\x01\x01\x12\x10\n\x03lng\x18\x04 \x01(\x01H\x01\x88\x01\x01\x42\x06\n\x04_latB\x06\n\x04_lng\"q\n\x07hubInfo\x12\r\n\x05hubID\x18\x01 \x01(\x05\x12\x0f\n\x07hubName\x18\x02 \x01(\t\x12\x12\n\nhubAddress\x18\x03 \x01(\t\x12\x10\n\x03lat\x18\x04 \x01(\x01H\x00\x88\x01\x01\x12\x10\n\x03lng\x18\x05 \x01(\x01H\x01\x88\x01\x01\x42\x06\n\x04_latB\x06\n\x04_lng\"\xd2\x01\n\tinputBody\x12\x11\n\tproductId\x18\x01 \x01(\t\x12\x16\n\x0eproductAddress\x18\x02 \x01(\t\x12\x19\n\x11productHubAddress\x18\x03 \x01(\t\x12%\n\rvolunteerList\x18\x04 \x03(\x0b\x32\x0e.volunteerInfo\x12\x16\n\x04hubs\x18\x05 \x03(\x0b\x32\x08.hubInfo\x12\x14\n\x0c\x61llowPartial\x18\x06 \x01(\x08\x12\x15\n\rmaxVolunteers\x18\x07 \x01(\x05\x12\x13\n\x0bmaxRadiusKm\x18\x08 \x01(\x01\"s\n\x0cresponseBody\x12\x11\n\tproductId\x18\x01 \x01(\t\x12\x10\n\x08userList\x18\x02 \x03(\t\x12\r\n\x05\x65rror\x18\x03 \x01(\t\x12\x1c\n\nclosestHub\x18\x04 \x01(\x0b\x32\x08.hubInfo\x12\x11\n\ttruncated\x18\x05 \x01(\x08\"4\n\x0evolunteerBatch\x12\"\n\nvolunteers\x18\x01 \x03(\x0b\x32\x0e.volunteerInfo\"\"\n\x0fvolunteerIdList\x12\x0f\n\x07userIds\x18\x01 \x03(\t\"e\n\x0bregistryAck\x12\x10\n\x08upserted\x18\x01 \x01(\x05\x12\x0f\n\x07removed\x18\x02 \x01(\x05\x12\r\n\x05total\x18\x03 \x01(\x05\x12\x15\n\rfailedUserIds\x18\x04 \x03(\t\x12\r\n\x05\x65rror\x18\x05 \x01(\t\"}\n\x0cproductQuery\x12\x11\n\tproductId\x18\x01 \x01(\t\x12\x16\n\x0eproductAddress\x18\x02 \x01(\t\x12\x16\n\x04hubs\x18\x03 \x03(\x0b\x32\x08.hubInfo\x12\x15\n\rmaxVolunteers\x18\x04 \x01(\x05\x12\x13\n\x0bmaxRadiusKm\x18\x05 \x01(\x01\"\xc7\x01\n\x0e\x62\x61tchInputBody\x12\x1f\n\x08products\x18\x01 \x03(\x0b\x32\r.productQuery\x12%\n\rvolunteerList\x18\x02 \x03(\x0b\x32\x0e.volunteerInfo\x12\x16\n\x04hubs\x18\x03 \x03(\x0b\x32\x08.hubInfo\x12\x13\n\x0buseRegistry\x18\x04 \x01(\x08\x12\x14\n\x0c\x61llowPartial\x18\x05 \x01(\x08\x12\x15\n\rmaxVolunteers\x18\x06 \x01(\x05\x12\x13\n\x0bmaxRadiusKm\x18\x07 \x01(\x01\"3\n\x11\x62\x61tchResponseBody\x12\x1e\n\x07results\x18\x01 \x03(\x0b\x32\r.responseBody\"`\n\x0evolunteerMatch\x12\x11\n\tproductId\x18\x01 \x01(\t\x12\x0e\n\x06userId\x18\x02 \x01(\t\x12\x1c\n\nclosestHub\x18\x03 \x01(\x0b\x32\x08.hubInfo\x12\r\n\x05\x65rror\x18\x04 \x01(\t2\xd8\x02\n\x06locate\x12/\n\x10getFilteredUsers\x12\n.inputBody\x1a\r.responseBody\"\x00\x12\x33\n\x10upsertVolunteers\x12\x0f.volunteerBatch\x1a\x0c.registryAck\"\x00\x12\x34\n\x10removeVolunteers\x12\x10.volunteerIdList\x1a\x0c.registryAck\"\x00\x12\x35\n\x13getNearbyVolunteers\x12\r.productQuery\x1a\r.responseBody\"\x00\x12>\n\x15getFilteredUsersBatch\x12\x0f.batchInputBody\x1a\x12.batchResponseBody\"\x00\x12;\n\x13streamFilteredUsers\x12\x0f.batchInputBody\x1a\x0f.volunteerMatch\"\x00\x30\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -32,13 +32,27 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'locate_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
   _globals['_VOLUNTEERINFO']._serialized_start=16
-  _globals['_VOLUNTEERINFO']._serialized_end=68
-  _globals['_HUBINFO']._serialized_start=70
-  _globals['_HUBINFO']._serialized_end=131
-  _globals['_INPUTBODY']._serialized_start=134
-  _globals['_INPUTBODY']._serialized_end=278
-  _globals['_RESPONSEBODY']._serialized_start=280
-  _globals['_RESPONSEBODY']._serialized_end=376
-  _globals['_LOCATE']._serialized_start=378
-  _globals['_LOCATE']._serialized_end=435
+  _globals['_VOLUNTEERINFO']._serialized_end=120
+  _globals['_HUBINFO']._serialized_start=122
+  _globals['_HUBINFO']._serialized_end=235
+  _globals['_INPUTBODY']._serialized_start=238
+  _globals['_INPUTBODY']._serialized_end=448
+  _globals['_RESPONSEBODY']._serialized_start=450
+  _globals['_RESPONSEBODY']._serialized_end=565
+  _globals['_VOLUNTEERBATCH']._serialized_start=567
+  _globals['_VOLUNTEERBATCH']._serialized_end=619
+  _globals['_VOLUNTEERIDLIST']._serialized_start=621
+  _globals['_VOLUNTEERIDLIST']._serialized_end=655
+  _globals['_REGISTRYACK']._serialized_start=657
+  _globals['_REGISTRYACK']._serialized_end=758
+  _globals['_PRODUCTQUERY']._serialized_start=760
+  _globals['_PRODUCTQUERY']._serialized_end=885
+  _globals['_BATCHINPUTBODY']._serialized_start=888
+  _globals['_BATCHINPUTBODY']._serialized_end=1087
+  _globals['_BATCHRESPONSEBODY']._serialized_start=1089
+  _globals['_BATCHRESPONSEBODY']._serialized_end=1140
+  _globals['_VOLUNTEERMATCH']._serialized_start=1142
+  _globals['_VOLUNTEERMATCH']._serialized_end=1238
+  _globals['_LOCATE']._serialized_start=1241
+  _globals['_LOCATE']._serialized_end=1585
 # @@protoc_insertion_point(module_scope)
@@ -39,6 +39,31 @@ class locateStub(object):
                 request_serializer=locate__pb2.inputBody.SerializeToString,
                 response_deserializer=locate__pb2.responseBody.FromString,
                 _registered_method=True)
+        self.upsertVolunteers = channel.unary_unary(
+                '/locate/upsertVolunteers',
+                request_serializer=locate__pb2.volunteerBatch.SerializeToString,
+                response_deserializer=locate__pb2.registryAck.FromString,
+                _registered_method=True)
+        self.removeVolunteers = channel.unary_unary(
+                '/locate/removeVolunteers',
+                request_serializer=locate__pb2.volunteerIdList.SerializeToString,
+                response_deserializer=locate__pb2.registryAck.FromString,
+                _registered_method=True)
+        self.getNearbyVolunteers = channel.unary_unary(
+                '/locate/getNearbyVolunteers',
+                request_serializer=locate__pb2.productQuery.SerializeToString,
+                response_deserializer=locate__pb2.responseBody.FromString,
+                _registered_method=True)
+        self.getFilteredUsersBatch = channel.unary_unary(
+                '/locate/getFilteredUsersBatch',
+                request_serializer=locate__pb2.batchInputBody.SerializeToString,
+                response_deserializer=locate__pb2.batchResponseBody.FromString,
+                _registered_method=True)
+        self.streamFilteredUsers = channel.unary_stream(
+                '/locate/streamFilteredUsers',
+                request_serializer=locate__pb2.batchInputBody.SerializeToString,
+                response_deserializer=locate__pb2.volunteerMatch.FromString,
+                _registered_method=True)
 
 
 class locateServicer(object):
@@ -50,6 +75,38 @@ class locateServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def upsertVolunteers(self, request, context):
+        """Resident volunteer registry: keep volunteers in locating and query by product only
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def removeVolunteers(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def getNearbyVolunteers(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def getFilteredUsersBatch(self, request, context):
+        """Resolve many products in one call, sharing geocoding and volunteer indexing
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def streamFilteredUsers(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_locateServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -58,6 +115,31 @@ def add_locateServicer_to_server(servicer, server):
                     request_deserializer=locate__pb2.inputBody.FromString,
                     response_serializer=locate__pb2.responseBody.SerializeToString,
             ),
+            'upsertVolunteers': grpc.unary_unary_rpc_method_handler(
+                    servicer.upsertVolunteers,
+                    request_deserializer=locate__pb2.volunteerBatch.FromString,
+                    response_serializer=locate__pb2.registryAck.SerializeToString,
+            ),
+            'removeVolunteers': grpc.unary_unary_rpc_method_handler(
+                    servicer.removeVolunteers,
+                    request_deserializer=locate__pb2.volunteerIdList.FromString,
+                    response_serializer=locate__pb2.registryAck.SerializeToString,
+            ),
+            'getNearbyVolunteers': grpc.unary_unary_rpc_method_handler(
+                    servicer.getNearbyVolunteers,
+                    request_deserializer=locate__pb2.productQuery.FromString,
+                    response_serializer=locate__pb2.responseBody.SerializeToString,
+            ),
+            'getFilteredUsersBatch': grpc.unary_unary_rpc_method_handler(
+                    servicer.getFilteredUsersBatch,
+                    request_deserializer=locate__pb2.batchInputBody.FromString,
+                    response_serializer=locate__pb2.batchResponseBody.SerializeToString,
+            ),
+            'streamFilteredUsers': grpc.unary_stream_rpc_method_handler(
+                    servicer.streamFilteredUsers,
+                    request_deserializer=locate__pb2.batchInputBody.FromString,
+                    response_serializer=locate__pb2.volunteerMatch.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'locate', rpc_method_handlers)
@@ -95,3 +177,138 @@ class locate(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def upsertVolunteers(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/locate/upsertVolunteers',
+            locate__pb2.volunteerBatch.SerializeToString,
+            locate__pb2.registryAck.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def removeVolunteers(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/locate/removeVolunteers',
+            locate__pb2.volunteerIdList.SerializeToString,
+            locate__pb2.registryAck.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def getNearbyVolunteers(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/locate/getNearbyVolunteers',
+            locate__pb2.productQuery.SerializeToString,
+            locate__pb2.responseBody.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def getFilteredUsersBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/locate/getFilteredUsersBatch',
+            locate__pb2.batchInputBody.SerializeToString,
+            locate__pb2.batchResponseBody.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def streamFilteredUsers(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/locate/streamFilteredUsers',
+            locate__pb2.batchInputBody.SerializeToString,
+            locate__pb2.volunteerMatch.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
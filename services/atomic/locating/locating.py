@@ -1,17 +1,63 @@
 from concurrent import futures
+import asyncio
+import multiprocessing
 import grpc
+from grpc_health.v1 import health, health_pb2, health_pb2_grpc
 import locate_pb2
 import locate_pb2_grpc
 import os
+import signal
 import logging
 
 import extra_functions
+from spatial_index import VolunteerIndex
+from registry import VolunteerRegistry, SnapshotVolunteerRegistry
+from hub_catchment import HubCatchmentCache
+from request_deadline import RequestDeadline, RequestCancelled
 
 # Simple logging setup
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SPATIAL_INDEX_CELL_KM = float(os.getenv("SPATIAL_INDEX_CELL_KM", "1.0"))
+HUB_CATCHMENT_CELL_KM = float(os.getenv("HUB_CATCHMENT_CELL_KM", "0.5"))
+HUB_INDEX_RADIUS_KM = float(os.getenv("HUB_INDEX_RADIUS_KM", "5.0"))
+HUB_INDEX_REFRESH_SECONDS = float(os.getenv("HUB_INDEX_REFRESH_SECONDS", "3600"))
+
+# Server settings
+LOCATING_SERVER_MODE = os.getenv("LOCATING_SERVER_MODE", "thread").lower()  # "thread" or "aio"
+# aio mode: threads for the matching that runs after geocoding has been awaited
+LOCATING_AIO_WORKERS = int(os.getenv("LOCATING_AIO_WORKERS", "4"))
+GRPC_MAX_WORKERS = int(os.getenv("GRPC_MAX_WORKERS", "10"))
+GRPC_MAX_CONCURRENT_RPCS = int(os.getenv("GRPC_MAX_CONCURRENT_RPCS", "0")) or None  # 0 = unlimited
+GRPC_KEEPALIVE_TIME_MS = int(os.getenv("GRPC_KEEPALIVE_TIME_MS", "30000"))
+GRPC_KEEPALIVE_TIMEOUT_MS = int(os.getenv("GRPC_KEEPALIVE_TIMEOUT_MS", "10000"))
+GRPC_KEEPALIVE_PERMIT_WITHOUT_CALLS = int(os.getenv("GRPC_KEEPALIVE_PERMIT_WITHOUT_CALLS", "1"))
+GRPC_MIN_PING_INTERVAL_MS = int(os.getenv("GRPC_MIN_PING_INTERVAL_MS", "10000"))
+# A full roster in inputBody is ~50 bytes per volunteer, so 100k volunteers exceed gRPC's 4MB default
+GRPC_MAX_RECEIVE_MESSAGE_MB = int(os.getenv("GRPC_MAX_RECEIVE_MESSAGE_MB", "4"))
+
+# Multi-process serving: workers share the gRPC port (SO_REUSEPORT) and a memory-mapped registry snapshot
+LOCATING_WORKERS = int(os.getenv("LOCATING_WORKERS", "1"))
+LOCATING_SNAPSHOT_PATH = os.getenv("LOCATING_SNAPSHOT_PATH") or ("volunteer_snapshot.bin" if LOCATING_WORKERS > 1 else "")
+
+def new_volunteer_index():
+    return VolunteerIndex(
+        cell_km=SPATIAL_INDEX_CELL_KM,
+        hub_radius_km=HUB_INDEX_RADIUS_KM,
+        hub_refresh_seconds=HUB_INDEX_REFRESH_SECONDS,
+    )
+
 class LocateService(locate_pb2_grpc.locateServicer):
+    def __init__(self):
+        # Volunteers registered through upsertVolunteers/removeVolunteers, queried by getNearbyVolunteers
+        if LOCATING_SNAPSHOT_PATH:
+            self.volunteer_registry = SnapshotVolunteerRegistry(LOCATING_SNAPSHOT_PATH, cell_km=SPATIAL_INDEX_CELL_KM)
+        else:
+            self.volunteer_registry = VolunteerRegistry(new_volunteer_index())
+        # Closest-hub lookup table, rebuilt only when the hub list in requests changes
+        self.hub_catchments = HubCatchmentCache(cell_km=HUB_CATCHMENT_CELL_KM)
+
     def getFilteredUsers(self, request, context):
         logger.info("Received Request")
         
@@ -23,8 +69,120 @@ class LocateService(locate_pb2_grpc.locateServicer):
         
         logger.info(request.hubs)
 
+        deadline = RequestDeadline(context)
+        return self._locate(
+            product_id,
+            product_address,
+            hub_list,
+            lambda center_point_coord, closest_hub: extra_functions.find_closest_users(
+                center_point_coord, volunteer_list, deadline, request.maxVolunteers, request.maxRadiusKm
+            ),
+            deadline,
+            request.allowPartial,
+        )
+
+    def upsertVolunteers(self, request, context):
+        try:
+            upserted, failed = self.volunteer_registry.upsert(request.volunteers)
+        except Exception as e:
+            logger.error(f"Error upserting volunteers: {str(e)}")
+            return locate_pb2.registryAck(total=len(self.volunteer_registry), error=f"Upsert error: {str(e)}")
+        logger.info(f"Registry upsert: {upserted} upserted, {len(failed)} failed, {len(self.volunteer_registry)} total")
+        return locate_pb2.registryAck(upserted=upserted, failedUserIds=failed, total=len(self.volunteer_registry))
+
+    def removeVolunteers(self, request, context):
+        removed = self.volunteer_registry.remove(request.userIds)
+        logger.info(f"Registry remove: {removed} removed, {len(self.volunteer_registry)} total")
+        return locate_pb2.registryAck(removed=removed, total=len(self.volunteer_registry))
+
+    def getNearbyVolunteers(self, request, context):
+        logger.info(f"Received registry query for product {request.productId}")
+        return self._locate(
+            request.productId,
+            request.productAddress,
+            request.hubs,
+            lambda center_point_coord, closest_hub: extra_functions.match_users(
+                lambda radius_km: self.volunteer_registry.within_radius_near_hub(
+                    closest_hub, center_point_coord["latitude"], center_point_coord["longitude"], radius_km
+                ),
+                request.maxVolunteers,
+                request.maxRadiusKm,
+            ),
+            RequestDeadline(context),
+        )
+
+    def getFilteredUsersBatch(self, request, context):
+        logger.info(f"Received batch request for {len(request.products)} products")
+        try:
+            return locate_pb2.batchResponseBody(results=list(self._locate_batch(request, RequestDeadline(context))))
+        except RequestCancelled as e:
+            logger.info(f"Stopped batch request: {str(e)}")
+            return locate_pb2.batchResponseBody()
+
+    def streamFilteredUsers(self, request, context):
+        logger.info(f"Received streaming request for {len(request.products)} products")
+        try:
+            yield from self._stream_matches(request, context)
+        except RequestCancelled as e:
+            logger.info(f"Stopped streaming request: {str(e)}")
+
+    def _stream_matches(self, request, context):
+        for result in self._locate_batch(request, RequestDeadline(context)):
+            if not context.is_active():
+                logger.info("Client went away, stopping stream")
+                return
+            if result.error:
+                yield locate_pb2.volunteerMatch(productId=result.productId, error=result.error)
+                continue
+            for user_id in result.userList:
+                yield locate_pb2.volunteerMatch(productId=result.productId, userId=user_id, closestHub=result.closestHub)
+
+    # Yields one responseBody per product, geocoding and indexing the shared volunteers and hubs only once
+    # raises RequestCancelled once the client has gone away
+    def _locate_batch(self, request, deadline):
+        if request.useRegistry:
+            volunteer_index = self.volunteer_registry.index
+        else:
+            volunteer_index = new_volunteer_index()
+            coords_list = extra_functions.resolve_coordinates(request.volunteerList, lambda volunteer: volunteer.userAddress, deadline)
+            for volunteer, coords in zip(request.volunteerList, coords_list):
+                if coords is not None:
+                    volunteer_index.upsert(volunteer.userId, coords["lat"], coords["lng"])
+
+        # Warm the geocode cache for every product and hub address in one concurrent pass; addresses
+        # it misses are geocoded again in _locate, so a cut-off here does not make any answer partial
+        extra_functions.convert_addresses(
+            [product.productAddress for product in request.products] + _batch_hub_addresses(request),
+            request_deadline=deadline,
+            mark_truncated=False,
+        )
+
+        # productQuery settings override the batch-wide ones when set
+        def users_finder(max_volunteers, max_radius_km):
+            def find_users(center_point_coord, closest_hub):
+                return extra_functions.match_users(
+                    lambda radius_km: volunteer_index.within_radius_near_hub(
+                        closest_hub, center_point_coord["latitude"], center_point_coord["longitude"], radius_km
+                    ),
+                    max_volunteers,
+                    max_radius_km,
+                )
+            return find_users
+
+        for product in request.products:
+            if deadline.cancelled():
+                raise RequestCancelled("client cancelled the request")
+            find_users = users_finder(product.maxVolunteers or request.maxVolunteers, product.maxRadiusKm or request.maxRadiusKm)
+            yield self._locate(product.productId, product.productAddress, product.hubs or request.hubs, find_users, deadline, request.allowPartial)
+
+    # Shared pipeline: geocode the product, pick the closest hub and match volunteers around the midpoint
+    # find_users takes the center point coordinate and closest hub and returns the matched volunteer ids
+    # deadline (RequestDeadline) stops the pipeline once the client gives up; if it cut volunteer geocoding
+    # short, allow_partial returns the volunteers found so far flagged as truncated instead of an error
+    def _locate(self, product_id, product_address, hub_list, find_users, deadline, allow_partial=False):
         # Validate product address
         try:
+            deadline.check()
             product_coord = extra_functions.convertAddress(product_address)
             if product_coord is None:
                 return locate_pb2.responseBody(
@@ -32,6 +190,13 @@ class LocateService(locate_pb2_grpc.locateServicer):
                     userList=[],
                     error="Not a valid product address!"
                 )
+        except RequestCancelled as e:
+            logger.info(f"Stopped locating product {product_id}: {str(e)}")
+            return locate_pb2.responseBody(
+                productId=product_id,
+                userList=[],
+                error=f"Request cancelled: {str(e)}"
+            )
         except Exception as e:
             logger.error(f"Error converting product address: {str(e)}")
             return locate_pb2.responseBody(
@@ -42,14 +207,21 @@ class LocateService(locate_pb2_grpc.locateServicer):
         
 
         # Find the hub closest to the product address
-        closest_hub_details = extra_functions.get_closest_hub(hub_list, product_coord)
+        closest_hub_details = extra_functions.get_closest_hub(hub_list, product_coord, self.hub_catchments)
 
 
         # Calculate center point and find closest users
-        hub_coord = extra_functions.convertAddress(closest_hub_details["hubAddress"])
         try:
+            hub_coord = {"lat": closest_hub_details["lat"], "lng": closest_hub_details["lng"]}
             center_point_coord = extra_functions.get_center_point(product_coord, hub_coord)
-            filtered_closest_list = extra_functions.find_closest_users(center_point_coord, volunteer_list)
+            filtered_closest_list = find_users(center_point_coord, closest_hub_details)
+        except RequestCancelled as e:
+            logger.info(f"Stopped locating product {product_id}: {str(e)}")
+            return locate_pb2.responseBody(
+                productId=product_id,
+                userList=[],
+                error=f"Request cancelled: {str(e)}"
+            )
         except Exception as e:
             logger.error(f"Error in filtering users: {str(e)}")
             return locate_pb2.responseBody(
@@ -59,6 +231,15 @@ class LocateService(locate_pb2_grpc.locateServicer):
             )
 
 
+        logger.info(f"Geocode cache: {extra_functions.geocode_cache_stats()}")
+
+        if deadline.truncated and not allow_partial:
+            return locate_pb2.responseBody(
+                productId=product_id,
+                userList=[],
+                error="Deadline exceeded before all volunteers were located; set allowPartial to accept a truncated list"
+            )
+
         # Create and return response
         del closest_hub_details["distToProduct"]
         try:
@@ -66,7 +247,8 @@ class LocateService(locate_pb2_grpc.locateServicer):
                 productId=product_id,
                 userList=filtered_closest_list,
                 closestHub = closest_hub_details,
-                error=None
+                error=None,
+                truncated=deadline.truncated
             )
             return response
         except Exception as e:
@@ -76,13 +258,199 @@ class LocateService(locate_pb2_grpc.locateServicer):
                 userList=[],
                 error=f"Response creation error: {str(e)}"
             )
+
+class AsyncLocateService(locate_pb2_grpc.locateServicer):
+    """
+    grpc.aio front for LocateService.
+    Each RPC first awaits the geocoding it needs through an AsyncGeocoder, so waiting on
+    the Geocoding API holds no thread. The matching that follows only reads the postal
+    table and geocode cache (extra_functions.cached_only) and runs on a small executor,
+    which keeps large rosters from stalling the event loop.
+    """
+
+    def __init__(self, service, geocoder, executor):
+        self._service = service
+        self._geocoder = geocoder
+        self._executor = executor
+
+    # addresses: lists geocoded one after another, each with its own GEOCODE_DEADLINE_SECONDS,
+    # like the product and hubs and then the volunteers in the thread pipeline
+    async def _prefetch(self, addresses, aio_context):
+        deadline = RequestDeadline(aio_context)
+        skipped = set()
+        for address_list in addresses:
+            skipped |= await self._geocoder.prefetch(address_list, deadline)
+        return skipped
+
+    async def _run(self, method, request, context, addresses):
+        loop = asyncio.get_running_loop()
+        aio_context = _AioContext(context)
+        try:
+            skipped = await self._prefetch(addresses, aio_context)
+            return await loop.run_in_executor(self._executor, _run_cached_only, skipped, method, request, aio_context)
+        except asyncio.CancelledError:
+            # The handler task is cancelled when the client goes away; let the pipeline thread know
+            aio_context.cancel()
+            raise
+
+    async def getFilteredUsers(self, request, context):
+        addresses = [
+            [request.productAddress] + _unlocated(request.hubs, lambda hub: hub.hubAddress),
+            _unlocated(request.volunteerList, lambda volunteer: volunteer.userAddress),
+        ]
+        return await self._run(self._service.getFilteredUsers, request, context, addresses)
+
+    async def upsertVolunteers(self, request, context):
+        addresses = [_unlocated(request.volunteers, lambda volunteer: volunteer.userAddress)]
+        return await self._run(self._service.upsertVolunteers, request, context, addresses)
+
+    async def removeVolunteers(self, request, context):
+        return await self._run(self._service.removeVolunteers, request, context, [])
+
+    async def getNearbyVolunteers(self, request, context):
+        addresses = [[request.productAddress] + _unlocated(request.hubs, lambda hub: hub.hubAddress)]
+        return await self._run(self._service.getNearbyVolunteers, request, context, addresses)
+
+    async def getFilteredUsersBatch(self, request, context):
+        return await self._run(self._service.getFilteredUsersBatch, request, context, _batch_addresses(request))
+
+    async def streamFilteredUsers(self, request, context):
+        loop = asyncio.get_running_loop()
+        aio_context = _AioContext(context)
+        try:
+            skipped = await self._prefetch(_batch_addresses(request), aio_context)
+            matches = self._service.streamFilteredUsers(request, aio_context)
+            done = object()
+            while True:
+                match = await loop.run_in_executor(self._executor, _run_cached_only, skipped, next, matches, done)
+                if match is done:
+                    return
+                yield match
+        except asyncio.CancelledError:
+            aio_context.cancel()
+            raise
+
+def _run_cached_only(skipped_keys, fn, *args):
+    with extra_functions.cached_only(skipped_keys):
+        return fn(*args)
+
+# Addresses of the volunteerInfo/hubInfo messages that do not carry their own lat/lng
+def _unlocated(messages, address_of):
+    return [address_of(message) for message in messages if extra_functions.message_coordinate(message) is None]
+
+# Hub addresses the products of a batch will use: their own hubs, or the batch-wide ones
+def _batch_hub_addresses(request):
+    addresses = []
+    if any(not product.hubs for product in request.products):
+        addresses += _unlocated(request.hubs, lambda hub: hub.hubAddress)
+    for product in request.products:
+        addresses += _unlocated(product.hubs, lambda hub: hub.hubAddress)
+    return addresses
+
+def _batch_addresses(request):
+    products = [product.productAddress for product in request.products] + _batch_hub_addresses(request)
+    if request.useRegistry:
+        return [products]
+    return [products, _unlocated(request.volunteerList, lambda volunteer: volunteer.userAddress)]
+
+class _AioContext:
+    # Exposes the parts of the sync ServicerContext API the pipeline uses on top of an aio context
+    def __init__(self, context):
+        self._context = context
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_active(self):
+        return not (self._cancelled or self._context.cancelled() or self._context.done())
+
+    def time_remaining(self):
+        return self._context.time_remaining()
+
+def server_options():
+    return [
+        ("grpc.keepalive_time_ms", GRPC_KEEPALIVE_TIME_MS),
+        ("grpc.keepalive_timeout_ms", GRPC_KEEPALIVE_TIMEOUT_MS),
+        ("grpc.keepalive_permit_without_calls", GRPC_KEEPALIVE_PERMIT_WITHOUT_CALLS),
+        ("grpc.http2.min_ping_interval_without_data_ms", GRPC_MIN_PING_INTERVAL_MS),
+        ("grpc.so_reuseport", 1),
+        ("grpc.max_receive_message_length", GRPC_MAX_RECEIVE_MESSAGE_MB * 1024 * 1024),
+    ]
+
+# Name clients check health under; the proto has no package, so it is the bare service name
+HEALTH_SERVICE_NAME = "locate"
+
+def health_statuses():
+    return [("", health_pb2.HealthCheckResponse.SERVING), (HEALTH_SERVICE_NAME, health_pb2.HealthCheckResponse.SERVING)]
+
 def serve():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    if LOCATING_WORKERS <= 1:
+        serve_process()
+        return
+
+    # Spawn rather than fork so no gRPC, SQLite or thread pool state crosses into the workers
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=serve_process, name=f"locating-{n}") for n in range(LOCATING_WORKERS)]
+    for worker in workers:
+        worker.start()
+    logger.info(f"Started {LOCATING_WORKERS} locating workers sharing snapshot {LOCATING_SNAPSHOT_PATH}")
+
+    # Pass shutdown on to the workers so none outlive the parent
+    def stop_workers(signum, frame):
+        for worker in workers:
+            worker.terminate()
+    signal.signal(signal.SIGTERM, stop_workers)
+    signal.signal(signal.SIGINT, stop_workers)
+    for worker in workers:
+        worker.join()
+
+def serve_process():
+    if LOCATING_SERVER_MODE == "aio":
+        asyncio.run(serve_aio())
+        return
+
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=GRPC_MAX_WORKERS),
+        options=server_options(),
+        maximum_concurrent_rpcs=GRPC_MAX_CONCURRENT_RPCS,
+    )
     locate_pb2_grpc.add_locateServicer_to_server(LocateService(), server)
+    # Non-blocking so each client's health Watch stream does not hold one of the GRPC_MAX_WORKERS threads
+    health_servicer = health.HealthServicer(
+        experimental_non_blocking=True,
+        experimental_thread_pool=futures.ThreadPoolExecutor(max_workers=1),
+    )
+    health_pb2_grpc.add_HealthServicer_to_server(health_servicer, server)
     port = os.getenv('GRPC_PORT', '5006')
     server.add_insecure_port(f"0.0.0.0:{port}")
     server.start()
+    for service, status in health_statuses():
+        health_servicer.set(service, status)
+    logger.info(f"Locating service listening on {port} (thread mode, {GRPC_MAX_WORKERS} workers)")
     server.wait_for_termination()
 
+async def serve_aio():
+    # aiohttp is only needed in aio mode
+    from async_geocoder import AsyncGeocoder
+
+    geocoder = AsyncGeocoder()
+    await geocoder.start()
+    executor = futures.ThreadPoolExecutor(max_workers=LOCATING_AIO_WORKERS, thread_name_prefix="locate")
+    server = grpc.aio.server(options=server_options(), maximum_concurrent_rpcs=GRPC_MAX_CONCURRENT_RPCS)
+    locate_pb2_grpc.add_locateServicer_to_server(AsyncLocateService(LocateService(), geocoder, executor), server)
+    health_servicer = health.aio.HealthServicer()
+    health_pb2_grpc.add_HealthServicer_to_server(health_servicer, server)
+    port = os.getenv('GRPC_PORT', '5006')
+    server.add_insecure_port(f"0.0.0.0:{port}")
+    await server.start()
+    for service, status in health_statuses():
+        await health_servicer.set(service, status)
+    logger.info(f"Locating service listening on {port} (aio mode, {geocoder.max_in_flight} geocoding requests in flight)")
+    try:
+        await server.wait_for_termination()
+    finally:
+        await geocoder.close()
+
 if __name__ == '__main__':
     serve()
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+Offline Singapore postal code -> coordinate lookup.
+
+The table is a flat binary file: a 16 byte header (magic + record count) followed by
+fixed-size little-endian records (uint32 postal code, float64 lat, float64 lng) sorted by
+postal code. It is memory-mapped once and searched with a binary search, so lookups
+touch a handful of pages and never allocate the whole table.
+
+Build a table from a CSV with postal,lat,lng columns:
+    python postal_geocoder.py build postal_codes.csv postal_codes.bin
+or a deterministic synthetic one for offline tests and benchmarks:
+    python postal_geocoder.py synthetic postal_codes.bin
+"""
+import csv
+import mmap
+import os
+import struct
+import sys
+import threading
+import logging
+
+from address_normalizer import match_postal_code
+
+logger = logging.getLogger(__name__)
+
+POSTAL_TABLE_PATH = os.getenv("POSTAL_TABLE_PATH", "postal_codes.bin")
+
+MAGIC = b"SGPOSTAL"
+HEADER = struct.Struct("<8sQ")
+RECORD = struct.Struct("<Idd")
+
+# Rough Singapore bounding box used for synthetic tables
+SYNTHETIC_LAT_RANGE = (1.24, 1.46)
+SYNTHETIC_LNG_RANGE = (103.62, 104.02)
+
+
+# Function to pull the 6-digit postal code out of an address
+# returns the postal code as an int, or None if the address has none
+def extract_postal_code(address):
+    match = match_postal_code(address.upper())
+    return int(match.group(1)) if match else None
+
+
+class PostalGeocoder:
+    def __init__(self, path=POSTAL_TABLE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.count = 0
+        self._mmap = None
+        self._lock = threading.Lock()
+
+        if not path or not os.path.exists(path):
+            logger.info(f"No postal code table at {path}, offline geocoding disabled")
+            return
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or HEADER.size + self.count * RECORD.size > len(self._mmap):
+            raise ValueError(f"{path} is not a postal code table")
+        logger.info(f"Loaded {self.count} postal codes from {path}")
+
+    @property
+    def enabled(self):
+        return self._mmap is not None
+
+    def _record(self, index):
+        return RECORD.unpack_from(self._mmap, HEADER.size + index * RECORD.size)
+
+    # returns coordinate dict for a postal code, or None when it is not in the table
+    def lookup(self, postal_code):
+        if self._mmap is None:
+            return None
+        low, high = 0, self.count - 1
+        while low <= high:
+            middle = (low + high) // 2
+            code, lat, lng = self._record(middle)
+            if code == postal_code:
+                return {"lat": lat, "lng": lng}
+            if code < postal_code:
+                low = middle + 1
+            else:
+                high = middle - 1
+        return None
+
+    # returns coordinate dict for an address with a known postal code, or None
+    def geocode(self, address):
+        if self._mmap is None:
+            return None
+        postal_code = extract_postal_code(address)
+        coordinate = self.lookup(postal_code) if postal_code is not None else None
+        with self._lock:
+            if coordinate is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return coordinate
+
+    def stats(self):
+        return {"enabled": self.enabled, "size": self.count, "hits": self.hits, "misses": self.misses}
+
+
+# Function to write a table from (postal code, lat, lng) rows; later duplicates win
+def write_table(path, rows):
+    table = {}
+    for postal_code, lat, lng in rows:
+        table[int(postal_code)] = (float(lat), float(lng))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(table)))
+        for postal_code in sorted(table):
+            f.write(RECORD.pack(postal_code, *table[postal_code]))
+    os.replace(tmp_path, path)
+    return len(table)
+
+
+# Function to place a postal code deterministically inside Singapore
+# the first two digits (postal sector) pick an anchor and the last four spread around it
+def synthetic_coordinate(postal_code):
+    sector, rest = divmod(int(postal_code), 10000)
+    # Spread the 83 sectors over a 9 x 10 grid of anchors
+    row, column = divmod(sector % 90, 10)
+    lat_span = SYNTHETIC_LAT_RANGE[1] - SYNTHETIC_LAT_RANGE[0]
+    lng_span = SYNTHETIC_LNG_RANGE[1] - SYNTHETIC_LNG_RANGE[0]
+    anchor_lat = SYNTHETIC_LAT_RANGE[0] + (row + 0.5) * lat_span / 9
+    anchor_lng = SYNTHETIC_LNG_RANGE[0] + (column + 0.5) * lng_span / 10
+    offset_lat = ((rest * 7919) % 1000 / 1000 - 0.5) * lat_span / 9
+    offset_lng = ((rest * 104729) % 1000 / 1000 - 0.5) * lng_span / 10
+    return {"lat": anchor_lat + offset_lat, "lng": anchor_lng + offset_lng}
+
+
+def synthetic_rows(sectors=range(1, 83), codes_per_sector=10000):
+    for sector in sectors:
+        for rest in range(codes_per_sector):
+            postal_code = sector * 10000 + rest
+            coordinate = synthetic_coordinate(postal_code)
+            yield postal_code, coordinate["lat"], coordinate["lng"]
+
+
+def read_csv_rows(path):
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            yield row["postal"], row["lat"], row["lng"]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "build":
+        written = write_table(sys.argv[3], read_csv_rows(sys.argv[2]))
+    elif len(sys.argv) == 3 and sys.argv[1] == "synthetic":
+        written = write_table(sys.argv[2], synthetic_rows())
+    else:
+        print(__doc__)
+        sys.exit(1)
+    print(f"Wrote {written} postal codes")
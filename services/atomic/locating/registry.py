@@ -0,0 +1,168 @@
+import fcntl
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import extra_functions
+from address_normalizer import normalize_address
+from coordinate_snapshot import CoordinateSnapshot, address_hash, write_snapshot
+from spatial_index import VolunteerIndex
+
+logger = logging.getLogger(__name__)
+
+
+class VolunteerRegistry:
+    """
+    Volunteers registered with the locating service through upsertVolunteers.
+    Coordinates live in a VolunteerIndex; a hash of the last known normalized address of
+    each volunteer is kept so re-upserting an unchanged volunteer does not geocode it again.
+    """
+
+    def __init__(self, index=None):
+        self.index = index if index is not None else VolunteerIndex()
+        self._addresses = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.index)
+
+    # Add or move volunteers (volunteerInfo messages)
+    # returns (number upserted, list of user ids that could not be located)
+    def upsert(self, volunteers):
+        with self._lock:
+            changed = [
+                volunteer for volunteer in volunteers
+                if extra_functions.message_coordinate(volunteer) is not None
+                or self._addresses.get(volunteer.userId) != address_hash(normalize_address(volunteer.userAddress))
+                or volunteer.userId not in self.index
+            ]
+
+        coords_list = extra_functions.resolve_coordinates(changed, lambda volunteer: volunteer.userAddress)
+
+        upserted = 0
+        failed = []
+        with self._lock:
+            for volunteer, coords in zip(changed, coords_list):
+                if coords is None:
+                    failed.append(volunteer.userId)
+                    continue
+                self.index.upsert(volunteer.userId, coords["lat"], coords["lng"])
+                self._addresses[volunteer.userId] = address_hash(normalize_address(volunteer.userAddress))
+                upserted += 1
+        return upserted, failed
+
+    # returns the number of volunteers that were actually registered
+    def remove(self, user_ids):
+        removed = 0
+        with self._lock:
+            for user_id in user_ids:
+                if user_id in self.index:
+                    self.index.remove(user_id)
+                    removed += 1
+                self._addresses.pop(user_id, None)
+        return removed
+
+    def within_radius(self, lat, lng, radius_km):
+        return self.index.within_radius(lat, lng, radius_km)
+
+    def within_radius_near_hub(self, hub, lat, lng, radius_km):
+        return self.index.within_radius_near_hub(hub, lat, lng, radius_km)
+
+
+class SnapshotVolunteerRegistry:
+    """
+    Volunteer registry shared by several locating worker processes.
+    The registry lives in a memory-mapped CoordinateSnapshot file; queries read it in
+    place and writers rewrite it under an exclusive file lock, swapping it in atomically.
+    Every worker notices a new snapshot on its next call.
+    """
+
+    def __init__(self, path, cell_km=1.0):
+        self.path = path
+        self.cell_km = cell_km
+        self._snapshot = None
+        self._lock = threading.Lock()
+        with self._write_lock():
+            if not os.path.exists(path):
+                write_snapshot(path, {}, version=0, cell_km=cell_km)
+            else:
+                try:
+                    CoordinateSnapshot(path)
+                except ValueError as e:
+                    # Callers resync a registry whose total drops, so starting empty is safe
+                    logger.warning(f"Discarding unreadable volunteer snapshot: {str(e)}")
+                    write_snapshot(path, {}, version=0, cell_km=cell_km)
+
+    # The current snapshot, reopened only when the file on disk has been replaced
+    @property
+    def index(self):
+        stat = os.stat(self.path)
+        with self._lock:
+            if self._snapshot is None or self._snapshot.identity != (stat.st_ino, stat.st_mtime_ns):
+                self._snapshot = CoordinateSnapshot(self.path)
+            return self._snapshot
+
+    def __len__(self):
+        return len(self.index)
+
+    @contextmanager
+    def _write_lock(self):
+        with open(f"{self.path}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _commit(self, apply):
+        # Re-read under the lock so concurrent writers in other workers are not lost
+        with self._write_lock():
+            snapshot = CoordinateSnapshot(self.path)
+            records = snapshot.to_dict()
+            result = apply(records)
+            write_snapshot(self.path, records, version=snapshot.version + 1, cell_km=self.cell_km)
+        return result
+
+    # Same contract as VolunteerRegistry.upsert
+    def upsert(self, volunteers):
+        if not volunteers:
+            return 0, []
+        snapshot = self.index
+        changed = []
+        for volunteer in volunteers:
+            volunteer_hash = address_hash(normalize_address(volunteer.userAddress))
+            row = snapshot.row_of(volunteer.userId)
+            if (extra_functions.message_coordinate(volunteer) is not None
+                    or row is None or int(snapshot.hashes[row]) != volunteer_hash):
+                changed.append((volunteer, volunteer_hash))
+        if not changed:
+            return 0, []
+
+        # Geocode outside the file lock
+        coords_list = extra_functions.resolve_coordinates([volunteer for volunteer, _ in changed], lambda volunteer: volunteer.userAddress)
+        failed = [volunteer.userId for (volunteer, _), coords in zip(changed, coords_list) if coords is None]
+        updates = {
+            volunteer.userId: (coords["lat"], coords["lng"], volunteer_hash)
+            for (volunteer, volunteer_hash), coords in zip(changed, coords_list)
+            if coords is not None
+        }
+        if updates:
+            self._commit(lambda latest: latest.update(updates))
+        return len(updates), failed
+
+    # Same contract as VolunteerRegistry.remove
+    def remove(self, user_ids):
+        def apply(records):
+            removed = 0
+            for user_id in user_ids:
+                if records.pop(user_id, None) is not None:
+                    removed += 1
+            return removed
+        return self._commit(apply)
+
+    def within_radius(self, lat, lng, radius_km):
+        return self.index.within_radius(lat, lng, radius_km)
+
+    def within_radius_near_hub(self, hub, lat, lng, radius_km):
+        return self.index.within_radius(lat, lng, radius_km)
@@ -0,0 +1,43 @@
+import os
+import time
+
+# Time kept back from the client's deadline to build and send the response
+DEADLINE_MARGIN_SECONDS = float(os.getenv("DEADLINE_MARGIN_SECONDS", "0.2"))
+
+
+class RequestCancelled(Exception):
+    """The client cancelled the RPC or its deadline passed; nobody will read the answer."""
+
+
+class RequestDeadline:
+    """
+    The gRPC deadline and cancellation state of one RPC, threaded through the geocoding
+    pipeline so work stops when the caller gives up.
+    truncated is set when addresses were skipped because the deadline was close, meaning
+    the result only covers the volunteers that could be located in time.
+    """
+
+    def __init__(self, context, margin_seconds=DEADLINE_MARGIN_SECONDS):
+        self._context = context
+        remaining = context.time_remaining()
+        self._expires_at = None if remaining is None else time.monotonic() + remaining - margin_seconds
+        self.truncated = False
+
+    # Seconds left before the response has to be on its way, None if the client set no deadline
+    def remaining(self):
+        if self._expires_at is None:
+            return None
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def expired(self):
+        return self._expires_at is not None and time.monotonic() >= self._expires_at
+
+    def cancelled(self):
+        return not self._context.is_active()
+
+    # Raise RequestCancelled if the client is gone, so callers stop before starting more work
+    def check(self):
+        if self.cancelled():
+            raise RequestCancelled("client cancelled the request")
+        if self.expired():
+            raise RequestCancelled("deadline exceeded")
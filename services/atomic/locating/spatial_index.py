@@ -0,0 +1,169 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+from coordinate_store import CoordinateStore
+from extra_functions import haversine, haversine_many
+
+KM_PER_DEGREE_LAT = 111.32
+
+
+class VolunteerIndex:
+    """
+    Uniform lat/lng grid over volunteer coordinates.
+    A radius query only visits the cells overlapping the search circle and then
+    applies the exact haversine check to the volunteers in those cells.
+    Coordinates live in a columnar CoordinateStore; cells hold store slots.
+    """
+
+    def __init__(self, cell_km=1.0, hub_radius_km=5.0, hub_refresh_seconds=3600):
+        self.cell_km = cell_km
+        self.lat_step = cell_km / KM_PER_DEGREE_LAT
+        # Cells are square in degrees; lng coverage per query is widened by cos(lat)
+        self.lng_step = self.lat_step
+        self.lock = threading.RLock()
+        self.store = CoordinateStore()
+        self._cells = {}
+        self.hub_index = HubVolunteerIndex(hub_radius_km, hub_refresh_seconds)
+
+    def __len__(self):
+        return len(self.store)
+
+    def __contains__(self, volunteer_id):
+        return volunteer_id in self.store
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.lat_step), math.floor(lng / self.lng_step))
+
+    def get(self, volunteer_id):
+        return self.store.get(volunteer_id)
+
+    def upsert(self, volunteer_id, lat, lng):
+        with self.lock:
+            previous = self.store.get(volunteer_id)
+            if previous == (lat, lng):
+                return
+            if previous is not None:
+                self._discard(self.store.slot(volunteer_id), previous)
+            slot = self.store.put(volunteer_id, lat, lng)
+            self._cells.setdefault(self._cell(lat, lng), set()).add(slot)
+            self.hub_index.update(slot, lat, lng)
+
+    def remove(self, volunteer_id):
+        with self.lock:
+            previous = self.store.get(volunteer_id)
+            if previous is not None:
+                slot = self.store.discard(volunteer_id)
+                self._discard(slot, previous)
+                self.hub_index.discard(slot)
+
+    def _discard(self, slot, point):
+        cell = self._cell(*point)
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(slot)
+            if not members:
+                del self._cells[cell]
+
+    def clear(self):
+        with self.lock:
+            self.store.clear()
+            self._cells.clear()
+            self.hub_index.clear()
+
+    # Returns the ids of volunteers strictly within radius_km, nearest first
+    def within_radius(self, lat, lng, radius_km):
+        with self.lock:
+            return self.store.ids_of(self._within_radius_slots(lat, lng, radius_km))
+
+    def _within_radius_slots(self, lat, lng, radius_km):
+        lat_cells = math.ceil(radius_km / (KM_PER_DEGREE_LAT * self.lat_step))
+        lng_cells = math.ceil(radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6) * self.lng_step))
+        center_i, center_j = self._cell(lat, lng)
+
+        candidate_slots = []
+        for i in range(center_i - lat_cells, center_i + lat_cells + 1):
+            for j in range(center_j - lng_cells, center_j + lng_cells + 1):
+                candidate_slots.extend(self._cells.get((i, j), ()))
+        return self._filter(candidate_slots, lat, lng, radius_km)
+
+    # Same as within_radius, but starts from the volunteers indexed around the closest hub
+    # (dict with hubID, lat, lng) when its inverted index entry is guaranteed to cover the circle
+    def within_radius_near_hub(self, hub, lat, lng, radius_km):
+        with self.lock:
+            members = self.hub_index.candidates(hub, lat, lng, radius_km, self._within_radius_slots)
+            if members is None:
+                return self.within_radius(lat, lng, radius_km)
+            return self.store.ids_of(self._filter(list(members), lat, lng, radius_km))
+
+    # returns the slots strictly within radius_km, nearest first
+    def _filter(self, candidate_slots, lat, lng, radius_km):
+        if not candidate_slots:
+            return []
+        candidate_slots = np.fromiter(candidate_slots, dtype=np.int64, count=len(candidate_slots))
+        distances = haversine_many(lng, lat, self.store.lngs[candidate_slots], self.store.lats[candidate_slots])
+        within = np.flatnonzero(distances < radius_km)
+        within = within[np.argsort(distances[within], kind="stable")]
+        return candidate_slots[within].tolist()
+
+
+class HubVolunteerIndex:
+    """
+    Inverted index from hub to the volunteers within radius_km of it.
+    A hub's entry is built on its first query, kept current as volunteers are added,
+    moved or removed, and rebuilt from scratch every refresh_seconds. Because a
+    volunteer within r of the product/hub midpoint is within r + d(midpoint, hub) of
+    the hub, the entry covers any query where that sum stays below radius_km.
+    Members are CoordinateStore slots. Callers hold the owning VolunteerIndex's lock.
+    """
+
+    def __init__(self, radius_km=5.0, refresh_seconds=3600):
+        self.radius_km = radius_km
+        self.refresh_seconds = refresh_seconds
+        self._entries = {}
+        self._hub_ids = []
+        self._lats = np.empty(0)
+        self._lngs = np.empty(0)
+
+    def _reindex_hubs(self):
+        self._hub_ids = list(self._entries)
+        self._lats = np.array([self._entries[hub_id]["lat"] for hub_id in self._hub_ids])
+        self._lngs = np.array([self._entries[hub_id]["lng"] for hub_id in self._hub_ids])
+
+    # returns the set of candidate slots, or None if the entry cannot cover the query
+    def candidates(self, hub, lat, lng, radius_km, within_radius):
+        if radius_km + haversine(hub["lng"], hub["lat"], lng, lat) >= self.radius_km:
+            return None
+        entry = self._entries.get(hub["hubID"])
+        stale = entry is None or (entry["lat"], entry["lng"]) != (hub["lat"], hub["lng"]) \
+            or time.monotonic() - entry["built_at"] > self.refresh_seconds
+        if stale:
+            entry = {
+                "lat": hub["lat"],
+                "lng": hub["lng"],
+                "built_at": time.monotonic(),
+                "members": set(within_radius(hub["lat"], hub["lng"], self.radius_km)),
+            }
+            self._entries[hub["hubID"]] = entry
+            self._reindex_hubs()
+        return entry["members"]
+
+    def update(self, slot, lat, lng):
+        if not self._hub_ids:
+            return
+        distances = haversine_many(lng, lat, self._lngs, self._lats)
+        for hub_id, distance in zip(self._hub_ids, distances):
+            if distance < self.radius_km:
+                self._entries[hub_id]["members"].add(slot)
+            else:
+                self._entries[hub_id]["members"].discard(slot)
+
+    def discard(self, slot):
+        for entry in self._entries.values():
+            entry["members"].discard(slot)
+
+    def clear(self):
+        self._entries.clear()
+        self._reindex_hubs()
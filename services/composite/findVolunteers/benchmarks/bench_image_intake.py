@@ -0,0 +1,184 @@
+"""
+Peak memory per listing upload: the old image handling (werkzeug's own spool, then
+requests re-reading and re-encoding the file for validation and again for product
+creation) against the ImageSpool intake stage that both calls share.
+A tiny Flask app receives the multipart upload and makes both downstream calls to a
+stand-in productValidation/product server running in a separate process. Peak Python
+allocations are measured with tracemalloc around one request.
+Run from services/composite/findVolunteers:
+    python benchmarks/bench_image_intake.py [--sizes-kb 100 1024 5120 20480] [--repeat 5]
+                                            [--output results.json]
+
+modes:
+    copying     default Request, files= uploads with stream.seek(0) between the calls
+    intake      SpoolingRequest, intake_image() and ImageSpool.multipart() bodies
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import requests
+from flask import Flask, jsonify, request
+from werkzeug.test import EnvironBuilder
+
+FIND_VOLUNTEERS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FIND_VOLUNTEERS_DIR)
+
+from image_intake import IMAGE_SPOOL_MEMORY_BYTES, SpoolingRequest, intake_image  # noqa: E402
+
+
+def serve_sink(port):
+    sink = Flask("sink")
+
+    @sink.route("/productValidation", methods=["POST"])
+    @sink.route("/product", methods=["POST"])
+    def receive():
+        for upload in request.files.values():
+            upload.stream.read()
+        return jsonify({"result": True, "productId": "product-1", "productAddress": "address"})
+
+    print("ready", flush=True)
+    sink.run(host="127.0.0.1", port=port, threaded=True)
+
+
+def copying_app(base_url, session):
+    app = Flask("copying")
+
+    @app.route("/findVolunteers", methods=["POST"])
+    def find_volunteers():
+        image = request.files["image"]
+        session.post(f"{base_url}/productValidation", files={"file": image}, data={"productDescription": '["tuna"]'})
+        image.stream.seek(0)
+        session.post(
+            f"{base_url}/product",
+            files={"productPic": (image.filename, image.stream, image.mimetype)},
+            data={"productAddress": "address", "productItemList": "[]", "productUserId": "1"},
+        )
+        return jsonify({"result": True})
+
+    return app
+
+
+def intake_app(base_url, session):
+    app = Flask("intake")
+    app.request_class = SpoolingRequest
+
+    @app.route("/findVolunteers", methods=["POST"])
+    def find_volunteers():
+        image = intake_image(request.files["image"])
+        for url, field, fields in (
+            (f"{base_url}/productValidation", "file", {"productDescription": '["tuna"]'}),
+            (f"{base_url}/product", "productPic", {"productAddress": "address", "productItemList": "[]", "productUserId": "1"}),
+        ):
+            body = image.multipart(field, fields)
+            session.post(url, data=body, headers={"Content-Type": body.content_type})
+        return jsonify({"result": True})
+
+    return app
+
+
+def measure(app, image, repeat):
+    peaks = []
+    latencies = []
+    for _ in range(repeat):
+        builder = EnvironBuilder(
+            path="/findVolunteers", method="POST",
+            data={"image": (io.BytesIO(image), "tuna.jpg", "image/jpeg")},
+        )
+        environ = builder.get_environ()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        response = app.wsgi_app(environ, lambda status, headers: None)
+        b"".join(response)
+        latencies.append(time.perf_counter() - started)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        builder.close()
+    return max(peaks), sorted(latencies)[len(latencies) // 2]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[100, 1024, 5120, 20480])
+    parser.add_argument("--modes", nargs="+", choices=["copying", "intake"], default=["copying", "intake"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: the stand-in downstream services
+    if args.serve is not None:
+        serve_sink(args.serve)
+        return
+
+    port = free_port()
+    sink = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", str(port)],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, cwd=FIND_VOLUNTEERS_DIR,
+    )
+    results = []
+    try:
+        sink.stdout.readline()
+        base_url = f"http://127.0.0.1:{port}"
+        session = requests.Session()
+        for _ in range(50):
+            try:
+                session.get(base_url)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        apps = {"copying": copying_app(base_url, session), "intake": intake_app(base_url, session)}
+
+        tracemalloc.start()
+        for size_kb in args.sizes_kb:
+            image = os.urandom(size_kb * 1024)
+            for mode in args.modes:
+                peak, latency = measure(apps[mode], image, args.repeat)
+                print(
+                    f"{size_kb}KB {mode}: peak {peak / 1024 / 1024:.2f}MB ({peak / len(image):.2f}x image), "
+                    f"p50 {latency * 1e3:.1f}ms",
+                    file=sys.stderr,
+                )
+                results.append({
+                    "image_kb": size_kb,
+                    "mode": mode,
+                    "peak_bytes": peak,
+                    "peak_per_image_byte": peak / len(image),
+                    "p50_ms": latency * 1e3,
+                })
+        tracemalloc.stop()
+    finally:
+        sink.terminate()
+        sink.wait()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "image_spool_memory_bytes": IMAGE_SPOOL_MEMORY_BYTES,
+        "settings": {key: value for key, value in vars(args).items() if key not in ("serve", "output")},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
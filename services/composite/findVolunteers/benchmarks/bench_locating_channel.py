@@ -0,0 +1,194 @@
+"""
+Benchmark of findVolunteers -> locating call overhead: a new channel per call (the old
+find_nearby_volunteers behaviour) against the shared LocatingClient channel.
+Locating is replaced by a stand-in servicer in a separate process that answers
+getFilteredUsers straight away (after --server-latency-ms), so the numbers are connection
+and serialization cost only. The request carries a roster of --volunteers volunteers.
+Run from services/composite/findVolunteers:
+    python benchmarks/bench_locating_channel.py [--requests 2000] [--concurrency 1 8 32]
+                                                [--volunteers 200] [--output results.json]
+
+modes:
+    per-call    grpc.insecure_channel + stub for every call, closed afterwards
+    pooled      one LocatingClient for the whole run, shared by all threads
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent import futures
+
+import grpc
+import numpy as np
+
+FIND_VOLUNTEERS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FIND_VOLUNTEERS_DIR)
+
+import locate_pb2  # noqa: E402
+import locate_pb2_grpc  # noqa: E402
+from grpc_health.v1 import health, health_pb2, health_pb2_grpc  # noqa: E402
+from locating_client import LocatingClient  # noqa: E402
+
+
+class StandInLocateService(locate_pb2_grpc.locateServicer):
+    def __init__(self, latency_ms):
+        self.latency_seconds = latency_ms / 1000
+
+    def getFilteredUsers(self, request, context):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return locate_pb2.responseBody(
+            productId=request.productId,
+            userList=[volunteer.userId for volunteer in request.volunteerList[:5]],
+            closestHub=request.hubs[0] if request.hubs else locate_pb2.hubInfo(),
+        )
+
+
+def serve(port, latency_ms):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=64))
+    locate_pb2_grpc.add_locateServicer_to_server(StandInLocateService(latency_ms), server)
+    health_servicer = health.HealthServicer()
+    health_servicer.set("locate", health_pb2.HealthCheckResponse.SERVING)
+    health_pb2_grpc.add_HealthServicer_to_server(health_servicer, server)
+    server.add_insecure_port(f"127.0.0.1:{port}")
+    server.start()
+    print("ready", flush=True)
+    server.wait_for_termination()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def build_request(volunteers):
+    return locate_pb2.inputBody(
+        productId="product-1",
+        productAddress="Blk 123 Synthetic Street 7 Singapore 520123",
+        volunteerList=[
+            locate_pb2.volunteerInfo(userId=f"volunteer-{k}", userAddress=f"Blk {k} Synthetic Street Singapore 52{k % 10000:04d}")
+            for k in range(volunteers)
+        ],
+        hubs=[locate_pb2.hubInfo(hubID=1, hubName="Hub 1", hubAddress="52 Hub Road Singapore 520001")],
+    )
+
+
+def run(mode, target, request, requests, concurrency, timeout):
+    client = LocatingClient(target)
+
+    def per_call():
+        channel = grpc.insecure_channel(target)
+        try:
+            return locate_pb2_grpc.locateStub(channel).getFilteredUsers(request, timeout=timeout)
+        finally:
+            channel.close()
+
+    def pooled():
+        return client.stub.getFilteredUsers(request, timeout=timeout)
+
+    call = per_call if mode == "per-call" else pooled
+    # Warm up outside the measurement, including the pooled channel's first connection
+    for _ in range(min(20, requests)):
+        call()
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def timed(_):
+        started = time.perf_counter()
+        try:
+            call()
+        except grpc.RpcError as rpc_error:
+            with lock:
+                errors.append(rpc_error.code().name)
+            return
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(requests)))
+    wall = time.perf_counter() - started
+    client.close()
+
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "p50_ms": float(np.percentile(latencies, 50) * 1e3) if latencies else None,
+        "p95_ms": float(np.percentile(latencies, 95) * 1e3) if latencies else None,
+        "p99_ms": float(np.percentile(latencies, 99) * 1e3) if latencies else None,
+        "mean_ms": float(np.mean(latencies) * 1e3) if latencies else None,
+        "throughput_rps": len(latencies) / wall if wall else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="measured calls per run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--modes", nargs="+", choices=["per-call", "pooled"], default=["per-call", "pooled"])
+    parser.add_argument("--volunteers", type=int, default=200, help="roster size sent with every call")
+    parser.add_argument("--server-latency-ms", type=float, default=0)
+    parser.add_argument("--timeout", type=float, default=30, help="per-call deadline in seconds")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: the stand-in locating server
+    if args.serve is not None:
+        serve(args.serve, args.server_latency_ms)
+        return
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", str(port), "--server-latency-ms", str(args.server_latency_ms)],
+        stdout=subprocess.PIPE, text=True, cwd=FIND_VOLUNTEERS_DIR,
+    )
+    try:
+        server.stdout.readline()
+        target = f"127.0.0.1:{port}"
+        request = build_request(args.volunteers)
+        results = []
+        for concurrency in args.concurrency:
+            for mode in args.modes:
+                print(f"running {mode}, concurrency {concurrency}...", file=sys.stderr)
+                result = run(mode, target, request, args.requests, concurrency, args.timeout)
+                print(
+                    f"  p50 {result['p50_ms']:.2f}ms  p95 {result['p95_ms']:.2f}ms  p99 {result['p99_ms']:.2f}ms  "
+                    f"{result['throughput_rps']:.0f} req/s  {result['errors']} errors",
+                    file=sys.stderr,
+                )
+                results.append(result)
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "grpc": grpc.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("serve", "output")},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 import json
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, url_for
+from werkzeug.exceptions import RequestEntityTooLarge
 from flask_cors import CORS
 import helper_functions
+from image_intake import SpoolingRequest, intake_image
+from jobs import JobStore
 import traceback
 import logging
 from flasgger import Swagger
@@ -13,9 +16,14 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+# Uploaded images are spooled once, straight from the form parser, and shared by every step
+app.request_class = SpoolingRequest
 CORS(app, origins=["*"])
 Swagger(app)
 
+# Background runs of the findVolunteers pipeline started through /findVolunteers/jobs
+job_store = JobStore()
+
 @app.route('/findVolunteers', methods=["POST"])
 def find_volunteers():
     """
@@ -91,6 +99,13 @@ def find_volunteers():
             error:
               type: string
               example: "No closest hub identified"
+      413:
+        description: Image larger than IMAGE_MAX_BYTES.
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
       510:
         description: Error occurred during product validation.
         schema:
@@ -186,47 +201,207 @@ def find_volunteers():
               type: string
     """
     try:
-        data = request.form
-        product_image = request.files.get('image')
-        product_address = data.get("productAddress")
-        product_item_list = data.get("productItemList")
-        product_user_id = data.get("productUserId")
-        
-
-        if isinstance(product_item_list, str):
-            product_item_list = json.loads(product_item_list)
-        
-        if not product_image:
-            logger.error("No image provided")
-            return jsonify({"error": "No image provided"}), 400
-        if not product_address:
-            logger.error("Product address is required")
-            return jsonify({"error": "Product address is required"}), 400
-        if not product_item_list:
-            logger.error("Product item list is required")
-            return jsonify({"error": "Product item list is required"}), 400
-        if not product_user_id:
-            logger.error("Product user id is required")
-            return jsonify({"error": "Product user id is required"}), 400
+        listing, error = read_listing_form()
+        if error:
+            return jsonify(error), 400
+
+        body, status = run_find_volunteers(*listing)
+        return jsonify(body), status
+
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+
+    except Exception as e:
+        tb = traceback.format_exc()
+        logger.error(f"Error in find_volunteers: {str(e)}\n{tb}")
+        return jsonify({"error": str(e), "traceback": tb}), 500
+
+
+@app.route('/findVolunteers/jobs', methods=["POST"])
+def submit_find_volunteers_job():
+    """
+    Start Find Volunteers Job
+    Accepts the same form as POST /findVolunteers but returns immediately with a job ID;
+    the pipeline runs on a background worker and its progress is read from the job status
+    endpoint (and pushed to the websocket service when WEBSOCKET_URL is set).
+    ---
+    consumes:
+      - multipart/form-data
+    parameters:
+      - name: image
+        in: formData
+        type: file
+        required: true
+      - name: productAddress
+        in: formData
+        type: string
+        required: true
+      - name: productItemList
+        in: formData
+        type: string
+        required: true
+      - name: productUserId
+        in: formData
+        type: string
+        required: true
+    responses:
+      202:
+        description: Job accepted.
+        schema:
+          type: object
+          properties:
+            jobId:
+              type: string
+            status:
+              type: string
+              example: "queued"
+            statusUrl:
+              type: string
+      400:
+        description: Bad request due to missing or invalid input.
+      413:
+        description: Image larger than IMAGE_MAX_BYTES.
+    """
+    try:
+        listing, error = read_listing_form()
+        if error:
+            return jsonify(error), 400
+
+        # The job holds on to the spooled image, which outlives this request
+        product_image, product_address, product_item_list, product_user_id = listing
+        job = job_store.submit(
+            lambda on_step: run_find_volunteers(product_image, product_address, product_item_list, product_user_id, on_step)
+        )
+        status_url = url_for("get_find_volunteers_job", job_id=job["jobId"])
+        logger.info(f"Queued findVolunteers job {job['jobId']}")
+        return jsonify({"jobId": job["jobId"], "status": job["status"], "statusUrl": status_url}), 202, {"Location": status_url}
+
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+
+    except Exception as e:
+        tb = traceback.format_exc()
+        logger.error(f"Error in submit_find_volunteers_job: {str(e)}\n{tb}")
+        return jsonify({"error": str(e), "traceback": tb}), 500
+
+
+@app.route('/findVolunteers/jobs/<job_id>', methods=["GET"])
+def get_find_volunteers_job(job_id):
+    """
+    Find Volunteers Job Status
+    Returns the job's status (queued, running, succeeded, failed), the step it is on, the
+    steps it has started so far and, once finished, the body and HTTP status the
+    synchronous endpoint would have returned.
+    ---
+    parameters:
+      - name: job_id
+        in: path
+        type: string
+        required: true
+    responses:
+      200:
+        description: Job found.
+      404:
+        description: Unknown or expired job.
+    """
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+
+@app.route('/internal/findVolunteers/cache/<name>/invalidate', methods=["POST"])
+def invalidate_cache(name):
+    """
+    Invalidate Cache (internal)
+    Marks a cached upstream resource as out of date so the next listing refreshes it, e.g.
+    after volunteers are added or change address, or a hub is created or moved.
+    Served under /internal for other services only; it is not routed through Kong.
+    ---
+    parameters:
+      - name: name
+        in: path
+        type: string
+        required: true
+        enum: ["volunteers", "hubs"]
+    responses:
+      200:
+        description: Cache invalidated; returns the cache's hit and refresh counters.
+      404:
+        description: Unknown cache.
+    """
+    cache = helper_functions.resource_caches.get(name)
+    if cache is None:
+        return jsonify({"error": f"Unknown cache {name}"}), 404
+    cache.invalidate()
+    return jsonify({"cache": name, "invalidated": True, "stats": dict(cache.stats)}), 200
+
+
+# Reads and checks the listing form shared by the sync and job endpoints
+# returns ((image spool, address, item list, user id), None) or (None, error body for a 400)
+# raises RequestEntityTooLarge when the image exceeds IMAGE_MAX_BYTES
+def read_listing_form():
+    data = request.form
+    product_image = request.files.get('image')
+    product_address = data.get("productAddress")
+    product_item_list = data.get("productItemList")
+    product_user_id = data.get("productUserId")
+
+    if isinstance(product_item_list, str):
+        product_item_list = json.loads(product_item_list)
+
+    if not product_image:
+        logger.error("No image provided")
+        return None, {"error": "No image provided"}
+    if not product_address:
+        logger.error("Product address is required")
+        return None, {"error": "Product address is required"}
+    if not product_item_list:
+        logger.error("Product item list is required")
+        return None, {"error": "Product item list is required"}
+    if not product_user_id:
+        logger.error("Product user id is required")
+        return None, {"error": "Product user id is required"}
+
+    return (intake_image(product_image), product_address, product_item_list, product_user_id), None
+
+
+# Runs steps 1-7 for one listing and returns (response body, HTTP status)
+# on_step is called with each step's name as it starts, for job progress reporting
+def run_find_volunteers(product_image, product_address, product_item_list, product_user_id, on_step=lambda step: None):
+    try:
+        # Steps 3 and 4 (and optionally locating) don't depend on the product, so in concurrent
+        # mode they run while it is validated and added; their errors still surface at their own step
+        volunteers_future = hubs_future = locate_future = None
+        hub_address = "yuup"
+        if helper_functions.FIND_VOLUNTEERS_CONCURRENT:
+            volunteers_future = helper_functions.step_executor.submit(helper_functions.get_all_volunteers)
+            hubs_future = helper_functions.step_executor.submit(helper_functions.get_all_hubs)
+            if helper_functions.FIND_VOLUNTEERS_SPECULATIVE_LOCATING:
+                locate_future = helper_functions.step_executor.submit(
+                    helper_functions.locate_volunteers_speculatively, product_address, hub_address, volunteers_future, hubs_future
+                )
 
         # Step 1: Validate Product
         try:
             logger.info("Starting Step 1: Product Validation")
+            on_step("Product Validation")
             validate_results = helper_functions.validate_image(product_image, product_item_list)["result"]
             if validate_results != True:
                 logger.warning(f"Image validation rejected: {validate_results}")
-                return jsonify({"message": validate_results}), 400
+                return {"message": validate_results}, 400
         except Exception as e:
             tb = traceback.format_exc()
-            return jsonify({
+            return {
                 "step": "Product Validation",
                 "error": str(e),
                 "traceback": tb
-            }), 510
+            }, 510
 
         # Step 2: Add Product
         try:
             logger.info("Starting Step 2: Adding Products")
+            on_step("Add Product")
             input_body = {
                 "productPic": product_image,
                 "productAddress": product_address,
@@ -236,53 +411,61 @@ def find_volunteers():
             product = helper_functions.add_product(input_body)
         except Exception as e:
             tb = traceback.format_exc() 
-            return jsonify({
+            return {
                 "step": "Add Product",
                 "error": str(e),
                 "traceback": tb
-            }), 520
+            }, 520
 
         # Step 3: Retrieve Volunteers
         try:
             logger.info("Starting Step 3: Getting all volunteers")
-            volunteer_list = helper_functions.get_all_volunteers()
+            on_step("Retrieve Volunteers")
+            volunteer_list = volunteers_future.result() if volunteers_future else helper_functions.get_all_volunteers()
             if not volunteer_list:
                 logger.error("No volunteers available")
-                return jsonify({"error": "No volunteers available"}), 404
+                return {"error": "No volunteers available"}, 404
         except Exception as e:
             tb = traceback.format_exc()
-            return jsonify({
+            return {
                 "step": "Retrieve Volunteers",
                 "error": str(e),
                 "traceback": tb
-            }), 530
+            }, 530
 
         # Step 4: Retrieve list of hubs
         logger.info("Starting Step 4: Getting all hubs")
-        hub_list = helper_functions.get_all_hubs()
+        on_step("Retrieve Hubs")
+        hub_list = hubs_future.result() if hubs_future else helper_functions.get_all_hubs()
 
         # Step 5: Filter Nearby Volunteers
         try:
             logger.info("Starting Step 5: Getting volunteers in 2km radius")
-            hub_address = "yuup"
+            on_step("Filter Nearby Volunteers")
             product_id = product["product_id"]
             logger.info(f"Inserted Address: {hub_address} | Product ID: {product_id}")
-            filtered_volunteers_result = helper_functions.find_nearby_volunteers(product_id, product_address, hub_address, volunteer_list,hub_list)
+            filtered_volunteers_result = locate_future.result() if locate_future else None
+            if filtered_volunteers_result is not None:
+                logger.info("Using speculative locating result")
+                filtered_volunteers_result["product_id"] = product_id
+            else:
+                filtered_volunteers_result = helper_functions.locate_volunteers(product_id, product_address, hub_address, volunteer_list, hub_list)
             filtered_volunteers_list = filtered_volunteers_result["user_list"]
             if len(filtered_volunteers_list) == 0:
                 logger.warning(f"No nearby volunteers found for product {product_id}")
-                return jsonify({"error": "No nearby volunteers found for product"}), 432
+                return {"error": "No nearby volunteers found for product"}, 432
         except Exception as e:
             tb = traceback.format_exc()
-            return jsonify({
+            return {
                 "step": "Filter Nearby Volunteers",
                 "error": str(e),
                 "traceback": tb
-            }), 540
+            }, 540
 
         # Step 6: Update Product Details with Volunteers
         try:
             logger.info("Starting Step 6: Updating product CC and userList")
+            on_step("Update Product Details")
             update_body = {
                 "productId": product_id,
                 "productUserList": filtered_volunteers_list,
@@ -291,35 +474,36 @@ def find_volunteers():
             updated_product = helper_functions.update_product_details(update_body)
             logger.info(updated_product)
             if "error" in updated_product:
-                return jsonify({"error": f"Failed to update product details: {updated_product['error']}"}), 500
+                return {"error": f"Failed to update product details: {updated_product['error']}"}, 500
         except Exception as e:
             tb = traceback.format_exc()
-            return jsonify({
+            return {
                 "step": "Update Product Details",
                 "error": str(e),
                 "traceback": tb
-            }), 550
+            }, 550
 
         # Step 7: Send Filtered Volunteers to Queue
         try:
             logger.info("Starting Step 7: Sending filtered list into queue")
+            on_step("Send to Queue")
             retrievedUserList = updated_product["productUserList"]
             helper_functions.sendToQueue(retrievedUserList)
         except Exception as e:
             tb = traceback.format_exc()
-            return jsonify({
+            return {
                 "step": "Send to Queue",
                 "error": str(e),
                 "traceback": tb
-            }), 560
+            }, 560
 
         logger.info("All Steps completed successfully!")
-        return jsonify({"result": True}), 200
+        return {"result": True}, 200
 
     except Exception as e:
         tb = traceback.format_exc()
         logger.error(f"Error in find_volunteers: {str(e)}\n{tb}")
-        return jsonify({"error": str(e), "traceback": tb}), 500
+        return {"error": str(e), "traceback": tb}, 500
 
 
 if __name__ == '__main__':
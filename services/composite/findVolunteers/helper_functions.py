@@ -3,13 +3,18 @@ import os
 from pathlib import Path
 import grpc
 import locate_pb2
-import locate_pb2_grpc
+from locating_client import LocatingClient
+from resource_cache import CachedResource
+from image_intake import intake_image
+from werkzeug.datastructures import FileStorage
 from datetime import datetime
 import json
 import time
 import pika 
 import amqp_lib
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Set up logging
 logging.basicConfig(
@@ -24,6 +29,65 @@ LOCATING_URL = os.environ.get('LOCATING_SERVICE_URL', "localhost:5006")
 USER_URL = os.environ.get('ACCOUNT_SERVICE_URL', "https://personal-tdqpornm.outsystemscloud.com/FoodBridge/rest/AccountInfoAPI")
 HUB_URL = os.environ.get('HUB_SERVICE_URL', "http://localhost:5010")
 
+# When enabled, volunteers are kept registered in the locating service and only products are sent per listing
+LOCATING_REGISTRY_MODE = os.environ.get('LOCATING_REGISTRY_MODE', 'false').lower() == 'true'
+# gRPC deadline for locating calls; locating stops geocoding once it passes
+LOCATING_TIMEOUT_SECONDS = float(os.environ.get('LOCATING_TIMEOUT_SECONDS', '30'))
+# Accept the volunteers located before the deadline (flagged as truncated) rather than an error
+LOCATING_ALLOW_PARTIAL = os.environ.get('LOCATING_ALLOW_PARTIAL', 'true').lower() == 'true'
+# Notify at most this many volunteers, nearest first (0 = everyone within 2km), searching up to the max radius
+LOCATING_MAX_VOLUNTEERS = int(os.environ.get('LOCATING_MAX_VOLUNTEERS', '0'))
+LOCATING_MAX_RADIUS_KM = float(os.environ.get('LOCATING_MAX_RADIUS_KM', '0'))
+
+# When enabled, volunteers and hubs are fetched while the product is validated and added
+FIND_VOLUNTEERS_CONCURRENT = os.environ.get('FIND_VOLUNTEERS_CONCURRENT', 'false').lower() == 'true'
+# On top of that, start locating as soon as volunteers and hubs arrive instead of after the product is added
+FIND_VOLUNTEERS_SPECULATIVE_LOCATING = os.environ.get('FIND_VOLUNTEERS_SPECULATIVE_LOCATING', 'false').lower() == 'true'
+FIND_VOLUNTEERS_WORKERS = int(os.environ.get('FIND_VOLUNTEERS_WORKERS', '16'))
+
+# One channel to locating for the whole process, shared by every request
+locating_client = LocatingClient(LOCATING_URL)
+
+# The volunteer roster changes a few times a day, so listings share a cached copy
+VOLUNTEER_ROSTER_CACHE = os.environ.get('VOLUNTEER_ROSTER_CACHE', 'true').lower() == 'true'
+VOLUNTEER_ROSTER_TTL_SECONDS = float(os.environ.get('VOLUNTEER_ROSTER_TTL_SECONDS', '300'))
+# How long past the TTL a stale roster is still served while it is refreshed in the background
+VOLUNTEER_ROSTER_STALE_SECONDS = float(os.environ.get('VOLUNTEER_ROSTER_STALE_SECONDS', '3600'))
+
+volunteer_roster = CachedResource(
+    "volunteer roster",
+    f"{USER_URL}/userAddress",
+    extract=lambda body: body["volunteerList"],
+    ttl_seconds=VOLUNTEER_ROSTER_TTL_SECONDS,
+    stale_seconds=VOLUNTEER_ROSTER_STALE_SECONDS,
+)
+
+# Hubs are revalidated with If-None-Match; the hub service answers an unchanged list with a 304
+HUB_DIRECTORY_CACHE = os.environ.get('HUB_DIRECTORY_CACHE', 'true').lower() == 'true'
+HUB_DIRECTORY_TTL_SECONDS = float(os.environ.get('HUB_DIRECTORY_TTL_SECONDS', '30'))
+HUB_DIRECTORY_STALE_SECONDS = float(os.environ.get('HUB_DIRECTORY_STALE_SECONDS', '300'))
+
+# function to accept only a list of hubs from the hub service, never an error body
+def hub_list_from_body(body):
+    if not isinstance(body, list):
+        raise ValueError(f"Unexpected allHubs response: {body}")
+    return body
+
+hub_directory = CachedResource(
+    "hub directory",
+    f"{HUB_URL}/internal/hub/allHubs",
+    extract=hub_list_from_body,
+    ttl_seconds=HUB_DIRECTORY_TTL_SECONDS,
+    stale_seconds=HUB_DIRECTORY_STALE_SECONDS,
+)
+
+# Caches that can be invalidated through POST /internal/findVolunteers/cache/<name>/invalidate
+# (internal only: Kong routes nothing under /internal, so it stays off the public gateway)
+resource_caches = {"volunteers": volunteer_roster, "hubs": hub_directory}
+
+# Shared by all requests for the independent lookups of concurrent mode
+step_executor = ThreadPoolExecutor(max_workers=FIND_VOLUNTEERS_WORKERS, thread_name_prefix="findVolunteers")
+
 
 RABBIT_HOST = os.environ.get('RABBIT_HOST', 'localhost')
 RABBIT_PORT = int(os.environ.get('RABBIT_PORT', 5672))
@@ -70,20 +134,20 @@ def sendToQueue(message):
 def validate_image(image, item_object):
     item_list = [item["itemName"] for item in item_object]
     try:
-        image_file = {'file':image}
-        
         # Convert the list to a JSON string
         json_str = json.dumps(item_list)
         data = {'productDescription': json_str}
 
-        logger.info(f"Image file: {image_file}")
+        logger.info(f"Image file: {image.filename} ({image.size} bytes)")
         logger.info(f"Data being sent: {data}")
 
+        # The image part is streamed from the intake buffer rather than re-read
+        body = image.multipart('file', data)
         response = invoke_http(
             f"{PRODUCT_VALIDATION_URL}/productValidation",
             method="POST",
-            files=image_file,
-            data=data
+            data=body,
+            headers={"Content-Type": body.content_type}
         )
         
         # Log the raw response for debugging
@@ -103,10 +167,6 @@ def add_product(body):
     # Create a copy of the body data for modification
     body_copy = body.copy()
     
-    # Reset the stream pointer to the beginning
-    image.stream.seek(0)
-    image_file = {'productPic': (image.filename, image.stream, image.mimetype)}
-    
     # Remove the image from the body
     del body_copy["productPic"]
     
@@ -117,11 +177,13 @@ def add_product(body):
     
     logger.info(f"Data sending: {body_copy}")
 
+    # Same intake buffer validate_image sent, no rewinding or second read
+    multipart_body = image.multipart('productPic', body_copy)
     response = invoke_http(
         f"{PRODUCT_LISTING_URL}/product",
         method="POST",
-        files=image_file,
-        data=body_copy  # Use the modified copy with JSON strings
+        data=multipart_body,
+        headers={"Content-Type": multipart_body.content_type}
     )
 
     logger.info(f"Response receieved: {response}")
@@ -138,6 +200,9 @@ def add_product(body):
 # function to retrieve all volunteers id and address with user service
 def get_all_volunteers():
     try:
+        if VOLUNTEER_ROSTER_CACHE:
+            return volunteer_roster.get()
+
         response = invoke_http(
             f"{USER_URL}/userAddress", 
             method="GET"
@@ -154,6 +219,13 @@ def get_all_volunteers():
 
 # function to retrieve all hubs
 def get_all_hubs():
+    if HUB_DIRECTORY_CACHE:
+        try:
+            return hub_directory.get()
+        except Exception as e:
+            logger.error(f"Error in get_all_hubs: {str(e)}")
+            return {"code": 500, "message": f"Hub service error: {str(e)}"}
+
     response = invoke_http(
         url=f"{HUB_URL}/internal/hub/allHubs",
         method= "GET"
@@ -162,21 +234,56 @@ def get_all_hubs():
     return response
 
 
+# function to pick out lat/lng from a volunteer or hub record when both are present
+def known_coordinates(record):
+    lat = record.get('lat')
+    lng = record.get('lng')
+    if lat is None or lng is None:
+        return {}
+    return {"lat": float(lat), "lng": float(lng)}
+
+
+# function to turn a locating responseBody into the result dict used by find_volunteers
+def locating_response_to_result(response):
+    # Process the response
+    result = {
+        "product_id": response.productId,
+        "user_list": list(response.userList),  # Convert from repeated field to list
+    }
+    
+    # Check if there's an error
+    if response.error:
+        result["error"] = response.error
+
+    if response.truncated:
+        result["truncated"] = True
+        logger.warning("Locating hit its deadline, volunteer list is partial")
+    
+    # Extract the closest hub information if available
+    if hasattr(response, 'closestHub') and response.closestHub:
+        result["closest_hub"] = {
+            "hubID": response.closestHub.hubID,
+            "hubName": response.closestHub.hubName,
+            "hubAddress": response.closestHub.hubAddress
+        }
+        logger.info(f"Closest hub: {result['closest_hub']['hubName']}")
+    
+    return result
+
+
 # function to run locating service with list of volunteer ids and address and id, address
 def find_nearby_volunteers(product_id, product_address, product_hub_address, volunteer_list, hub_list):
     try:
-        # Create a gRPC channel
-        channel = grpc.insecure_channel(LOCATING_URL)
-        
-        # Create a stub (client)
-        stub = locate_pb2_grpc.locateStub(channel)
-        
+        stub = locating_client.stub
+
         # Create volunteer info objects from the list
+        # Pass known coordinates along so locating can skip geocoding them
         volunteer_infos = []
         for volunteer in volunteer_list:
             volunteer_info = locate_pb2.volunteerInfo(
                 userId=volunteer['userId'],
-                userAddress=volunteer['userAddress']
+                userAddress=volunteer['userAddress'],
+                **known_coordinates(volunteer)
             )
             volunteer_infos.append(volunteer_info)
         
@@ -186,7 +293,8 @@ def find_nearby_volunteers(product_id, product_address, product_hub_address, vol
             hub_info = locate_pb2.hubInfo(
                 hubID=hub['hubID'],
                 hubName=hub['hubName'],
-                hubAddress=hub['hubAddress']
+                hubAddress=hub['hubAddress'],
+                **known_coordinates(hub)
             )
             hub_infos.append(hub_info)
         
@@ -198,34 +306,18 @@ def find_nearby_volunteers(product_id, product_address, product_hub_address, vol
             productAddress=product_address,
             productHubAddress=product_hub_address,
             volunteerList=volunteer_infos,
-            hubs=hub_infos  # Add the hub list to the request
+            hubs=hub_infos,  # Add the hub list to the request
+            allowPartial=LOCATING_ALLOW_PARTIAL,
+            maxVolunteers=LOCATING_MAX_VOLUNTEERS,
+            maxRadiusKm=LOCATING_MAX_RADIUS_KM
         )
         
         # Make the gRPC call
         logger.info("Sending request to locating service...")
-        response = stub.getFilteredUsers(request)
+        response = stub.getFilteredUsers(request, timeout=LOCATING_TIMEOUT_SECONDS)
         logger.info(f"Received response from locating service: {response.error if response.error else 'Success'}")
         
-        # Process the response
-        result = {
-            "product_id": response.productId,
-            "user_list": list(response.userList),  # Convert from repeated field to list
-        }
-        
-        # Check if there's an error
-        if response.error:
-            result["error"] = response.error
-        
-        # Extract the closest hub information if available
-        if hasattr(response, 'closestHub') and response.closestHub:
-            result["closest_hub"] = {
-                "hubID": response.closestHub.hubID,
-                "hubName": response.closestHub.hubName,
-                "hubAddress": response.closestHub.hubAddress
-            }
-            logger.info(f"Closest hub: {result['closest_hub']['hubName']}")
-        
-        return result
+        return locating_response_to_result(response)
         
     except grpc.RpcError as rpc_error:
         # Handle gRPC specific errors
@@ -242,6 +334,115 @@ def find_nearby_volunteers(product_id, product_address, product_hub_address, vol
         return {"error": f"General error: {str(e)}"}
 
 
+# function to match volunteers to a product through the locating service, in registry mode when enabled
+def locate_volunteers(product_id, product_address, product_hub_address, volunteer_list, hub_list):
+    if LOCATING_REGISTRY_MODE:
+        sync_volunteer_registry(volunteer_list)
+        return find_registered_nearby_volunteers(product_id, product_address, hub_list)
+    return find_nearby_volunteers(product_id, product_address, product_hub_address, volunteer_list, hub_list)
+
+
+# function to locate volunteers before the product exists, once the volunteer and hub futures resolve
+# the product id is filled in later; returns None when locating cannot start or fails, so the
+# caller falls back to locating after the product is added
+def locate_volunteers_speculatively(product_address, product_hub_address, volunteers_future, hubs_future):
+    try:
+        volunteer_list = volunteers_future.result()
+        hub_list = hubs_future.result()
+        if not isinstance(volunteer_list, list) or not volunteer_list:
+            return None
+        result = locate_volunteers("", product_address, product_hub_address, volunteer_list, hub_list)
+        # Without user_list the call itself failed (e.g. locating unreachable), which is worth retrying
+        if "user_list" not in result:
+            logger.warning(f"Speculative locating failed, will retry after adding the product: {result.get('error')}")
+            return None
+        return result
+    except Exception as e:
+        logger.warning(f"Speculative locating failed, will retry after adding the product: {str(e)}")
+        return None
+
+
+# Volunteers last pushed to the locating registry: userId -> (userAddress, lat, lng)
+registered_volunteers = {}
+registry_lock = threading.Lock()
+
+# function to bring the locating service's volunteer registry in line with volunteer_list
+# only new, moved and removed volunteers are sent; a full resync happens if locating lost its registry
+def sync_volunteer_registry(volunteer_list):
+    with registry_lock:
+        stub = locating_client.stub
+
+        current = {}
+        for volunteer in volunteer_list:
+            coords = known_coordinates(volunteer)
+            current[volunteer['userId']] = (volunteer['userAddress'], coords.get('lat'), coords.get('lng'))
+
+        removed_ids = [user_id for user_id in registered_volunteers if user_id not in current]
+        changed_ids = [user_id for user_id, entry in current.items() if registered_volunteers.get(user_id) != entry]
+
+        if removed_ids:
+            stub.removeVolunteers(locate_pb2.volunteerIdList(userIds=removed_ids), timeout=LOCATING_TIMEOUT_SECONDS)
+            for user_id in removed_ids:
+                del registered_volunteers[user_id]
+
+        # An empty batch still returns the registry size, which tells us whether locating restarted
+        ack = stub.upsertVolunteers(_volunteer_batch(current, changed_ids), timeout=LOCATING_TIMEOUT_SECONDS)
+        registered_volunteers.update({user_id: current[user_id] for user_id in changed_ids if user_id not in ack.failedUserIds})
+
+        if ack.total != len(registered_volunteers):
+            logger.warning(f"Locating registry has {ack.total} volunteers, expected {len(registered_volunteers)}; resyncing")
+            registered_volunteers.clear()
+            ack = stub.upsertVolunteers(_volunteer_batch(current, list(current)), timeout=LOCATING_TIMEOUT_SECONDS)
+            registered_volunteers.update({user_id: entry for user_id, entry in current.items() if user_id not in ack.failedUserIds})
+
+        logger.info(f"Volunteer registry synced: {len(changed_ids)} upserted, {len(removed_ids)} removed, {ack.total} total")
+        return ack.total
+
+def _volunteer_batch(entries, user_ids):
+    volunteers = []
+    for user_id in user_ids:
+        address, lat, lng = entries[user_id]
+        coords = {} if lat is None else {"lat": lat, "lng": lng}
+        volunteers.append(locate_pb2.volunteerInfo(userId=user_id, userAddress=address, **coords))
+    return locate_pb2.volunteerBatch(volunteers=volunteers)
+
+
+# function to query the locating service's volunteer registry with just the product and hubs
+def find_registered_nearby_volunteers(product_id, product_address, hub_list):
+    try:
+        stub = locating_client.stub
+
+        hub_infos = [
+            locate_pb2.hubInfo(
+                hubID=hub['hubID'],
+                hubName=hub['hubName'],
+                hubAddress=hub['hubAddress'],
+                **known_coordinates(hub)
+            )
+            for hub in hub_list
+        ]
+        request = locate_pb2.productQuery(
+            productId=product_id,
+            productAddress=product_address,
+            hubs=hub_infos,
+            maxVolunteers=LOCATING_MAX_VOLUNTEERS,
+            maxRadiusKm=LOCATING_MAX_RADIUS_KM,
+        )
+
+        logger.info("Sending registry query to locating service...")
+        response = stub.getNearbyVolunteers(request, timeout=LOCATING_TIMEOUT_SECONDS)
+        logger.info(f"Received response from locating service: {response.error if response.error else 'Success'}")
+        return locating_response_to_result(response)
+
+    except grpc.RpcError as rpc_error:
+        logger.error(f"gRPC error: {rpc_error.code()}, {rpc_error.details()}")
+        return {"error": f"Locating service error: {rpc_error.details()}"}
+
+    except Exception as e:
+        logger.error(f"Error in find_registered_nearby_volunteers: {str(e)}")
+        return {"error": f"General error: {str(e)}"}
+
+
 def update_product_details(input_body):
     try:
         response = invoke_http(
@@ -273,7 +474,7 @@ def test_validate_image():
     # Open the image file
     with open(image_path, 'rb') as image_file:
         # Call the validation function
-        result = validate_image(image_file, description)
+        result = validate_image(intake_image(FileStorage(image_file, filename="tuna.jpg", content_type="image/jpeg")), description)
         
     # Print the result
     print("Validation result:")
@@ -287,7 +488,7 @@ def test_add_product():
     with open(image_path, 'rb') as img_file:
         # Create a simple dictionary with the required data
         product_data = {
-            'productPic': img_file,
+            'productPic': intake_image(FileStorage(img_file, filename="tuna.jpg", content_type="image/jpeg")),
             'productItemList': [{"itemName":"tuna","quantity":10},{"itemName":"beans","quantity":10},{"itemName":"pickled vegetables","quantity":10}],
             'productAddress': "123 Main St, Singapore 123456",
         }
@@ -0,0 +1,209 @@
+import hashlib
+import io
+import logging
+import mmap
+import os
+import tempfile
+import uuid
+
+from flask import Request
+from urllib3.fields import RequestField
+from werkzeug.exceptions import RequestEntityTooLarge
+
+logger = logging.getLogger(__name__)
+
+# Uploads up to this size stay in memory; larger ones go to an unlinked temp file
+IMAGE_SPOOL_MEMORY_BYTES = int(os.environ.get('IMAGE_SPOOL_MEMORY_BYTES', str(1024 * 1024)))
+# Uploads beyond this size are rejected with a 413 while they are being read
+IMAGE_MAX_BYTES = int(os.environ.get('IMAGE_MAX_BYTES', str(20 * 1024 * 1024)))
+# Chunk size for copying an upload that did not arrive through SpoolingRequest
+COPY_CHUNK_BYTES = 64 * 1024
+
+
+class ImageSpool(io.RawIOBase):
+    """
+    The single buffer an uploaded image lives in, written once as the upload is read and
+    hashed on the way in. It stays in memory up to IMAGE_SPOOL_MEMORY_BYTES, beyond that
+    it goes to an unlinked temp file. Once written it is read-only: view() is a zero-copy
+    memoryview of the bytes (the temp file is memory-mapped), and multipart() builds request
+    bodies that send that view directly, so validation and product creation share it.
+    Buffers are released with the last reference, not on close(), so a background job can
+    keep using the image after its request has been torn down.
+    """
+
+    def __init__(self, memory_bytes=IMAGE_SPOOL_MEMORY_BYTES, max_bytes=IMAGE_MAX_BYTES):
+        super().__init__()
+        self.memory_bytes = memory_bytes
+        self.max_bytes = max_bytes
+        self.filename = None
+        self.content_type = None
+        self.size = 0
+        self.peak_memory_bytes = 0
+        self._hash = hashlib.sha256()
+        self._memory = bytearray()
+        self._file = None
+        self._view = None
+        self._position = 0
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    @property
+    def on_disk(self):
+        return self._file is not None
+
+    def writable(self):
+        return self._view is None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def write(self, data):
+        if self._view is not None:
+            raise ValueError("ImageSpool is read-only once it has been read")
+        if self.size + len(data) > self.max_bytes:
+            raise RequestEntityTooLarge(f"Image is larger than {self.max_bytes} bytes")
+        self.size += len(data)
+        self._hash.update(data)
+        if self._file is None and self.size > self.memory_bytes:
+            self._file = tempfile.TemporaryFile(prefix="findVolunteers-image-")
+            self._file.write(self._memory)
+            self._memory = bytearray()
+        if self._file is None:
+            self._memory += data
+            self.peak_memory_bytes = max(self.peak_memory_bytes, len(self._memory))
+        else:
+            self._file.write(data)
+        return len(data)
+
+    # Function to expose the spooled bytes without copying them
+    # returns a read-only memoryview; the spool cannot be written after this
+    def view(self):
+        if self._view is None:
+            if self._file is None:
+                self._view = memoryview(self._memory).toreadonly()
+            elif self.size == 0:
+                self._view = memoryview(b"")
+            else:
+                self._file.flush()
+                self._view = memoryview(mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ))
+        return self._view
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self._position = max(0, offset)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    # Reading returns slices of the view, so plain file-style consumers copy nothing either
+    def read(self, size=-1):
+        view = self.view()
+        end = self.size if size is None or size < 0 else min(self.size, self._position + size)
+        chunk = view[self._position:end]
+        self._position = end
+        return chunk
+
+    def readinto(self, buffer):
+        chunk = self.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+    def close(self):
+        pass
+
+    # Function to build a multipart/form-data body with the image under file_field plus text fields
+    def multipart(self, file_field, fields=None):
+        boundary = uuid.uuid4().hex
+        parts = []
+        for name, value in (fields or {}).items():
+            field = RequestField(name=name, data=str(value))
+            field.make_multipart()
+            parts += [f"--{boundary}\r\n".encode(), field.render_headers().encode(), str(value).encode(), b"\r\n"]
+        image_field = RequestField(name=file_field, data=b"", filename=self.filename or file_field)
+        image_field.make_multipart(content_type=self.content_type or "application/octet-stream")
+        parts += [f"--{boundary}\r\n".encode(), image_field.render_headers().encode(), self.view(), b"\r\n"]
+        parts.append(f"--{boundary}--\r\n".encode())
+        return MultipartBody(parts, f"multipart/form-data; boundary={boundary}")
+
+    def describe(self):
+        return {
+            "size": self.size,
+            "sha256": self.sha256,
+            "onDisk": self.on_disk,
+            "peakMemoryBytes": self.peak_memory_bytes,
+        }
+
+
+class MultipartBody:
+    """
+    A request body sent part by part. The parts are bytes and memoryviews and are never
+    joined, so the image part goes out straight from its ImageSpool. requests streams it
+    with a Content-Length, because the body has a length and can be iterated.
+    """
+
+    def __init__(self, parts, content_type):
+        self.content_type = content_type
+        self._parts = [memoryview(part) for part in parts]
+        self._length = sum(len(part) for part in self._parts)
+        self._index = 0
+        self._offset = 0
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        chunk = self.read(COPY_CHUNK_BYTES)
+        while chunk:
+            yield chunk
+            chunk = self.read(COPY_CHUNK_BYTES)
+
+    def read(self, size=-1):
+        while self._index < len(self._parts):
+            part = self._parts[self._index]
+            if self._offset < len(part):
+                end = len(part) if size is None or size < 0 else min(len(part), self._offset + size)
+                chunk = part[self._offset:end]
+                self._offset = end
+                return chunk
+            self._index += 1
+            self._offset = 0
+        return b""
+
+
+class SpoolingRequest(Request):
+    # Have the form parser write file uploads straight into an ImageSpool instead of its own buffer
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        spool = ImageSpool()
+        spool.filename = filename
+        spool.content_type = content_type
+        return spool
+
+
+# Function to turn an uploaded FileStorage into its ImageSpool
+# uploads parsed by SpoolingRequest are already spooled; anything else is copied in once
+def intake_image(upload):
+    spool = upload.stream
+    if not isinstance(spool, ImageSpool):
+        spool = ImageSpool()
+        while True:
+            chunk = upload.stream.read(COPY_CHUNK_BYTES)
+            if not chunk:
+                break
+            spool.write(chunk)
+    spool.filename = upload.filename
+    spool.content_type = upload.mimetype or spool.content_type
+    spool.seek(0)
+    logger.info(
+        f"Image intake: {spool.filename} {spool.size} bytes sha256={spool.sha256[:16]} "
+        f"{'spooled to disk' if spool.on_disk else 'in memory'}, peak {spool.peak_memory_bytes} bytes held in memory"
+    )
+    return spool
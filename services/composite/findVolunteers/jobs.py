@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import logging
+import os
+import threading
+import time
+import uuid
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+FIND_VOLUNTEERS_JOB_WORKERS = int(os.environ.get('FIND_VOLUNTEERS_JOB_WORKERS', '4'))
+# Finished jobs stay queryable for this long
+FIND_VOLUNTEERS_JOB_TTL_SECONDS = int(os.environ.get('FIND_VOLUNTEERS_JOB_TTL_SECONDS', '3600'))
+# When set, every job update is also pushed to the websocket service (POST /sendJobUpdate)
+WEBSOCKET_URL = os.environ.get('WEBSOCKET_URL', '')
+
+
+class JobStore:
+    """
+    In-memory registry of findVolunteers jobs run on a background pool.
+    A job moves queued -> running -> succeeded / failed, recording the step it is on;
+    the final HTTP status and body the synchronous endpoint would have returned are
+    kept as its result. Jobs are process-local, so a restart forgets them.
+    """
+
+    def __init__(self, max_workers=FIND_VOLUNTEERS_JOB_WORKERS, ttl_seconds=FIND_VOLUNTEERS_JOB_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="findVolunteersJob")
+        self._jobs = {}
+        self._finished_at = {}
+        self._lock = threading.Lock()
+
+    # Queue run(on_step) and return the new job; run returns (response body, HTTP status)
+    def submit(self, run):
+        job_id = uuid.uuid4().hex
+        job = {
+            "jobId": job_id,
+            "status": "queued",
+            "step": None,
+            "steps": [],
+            "result": None,
+            "httpStatus": None,
+            "createdAt": _now(),
+            "updatedAt": _now(),
+        }
+        with self._lock:
+            self._expire()
+            self._jobs[job_id] = job
+        self._executor.submit(self._run, job_id, run)
+        return self.get(job_id)
+
+    # Returns a copy of the job, or None if it is unknown or expired
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return None if job is None else dict(job, steps=list(job["steps"]))
+
+    def _run(self, job_id, run):
+        self._update(job_id, status="running")
+        try:
+            body, status = run(lambda step: self._update(job_id, step=step))
+        except Exception as e:
+            logger.error(f"Job {job_id} crashed: {str(e)}")
+            body, status = {"error": str(e)}, 500
+        self._update(job_id, status="succeeded" if status == 200 else "failed", result=body, httpStatus=status)
+
+    def _update(self, job_id, **changes):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if changes.get("step"):
+                job["steps"].append(changes["step"])
+            job.update(changes, updatedAt=_now())
+            if job["status"] in ("succeeded", "failed"):
+                self._finished_at[job_id] = time.monotonic()
+        self._publish(job_id)
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        for job_id in [job_id for job_id, finished_at in self._finished_at.items() if finished_at < cutoff]:
+            del self._jobs[job_id]
+            del self._finished_at[job_id]
+
+    # Best effort: a websocket outage must never fail the job itself
+    def _publish(self, job_id):
+        if not WEBSOCKET_URL:
+            return
+        job = self.get(job_id)
+        try:
+            requests.post(f"{WEBSOCKET_URL}/sendJobUpdate", json=job, timeout=2)
+        except Exception as e:
+            logger.warning(f"Could not push job {job_id} update to websocket: {str(e)}")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+import threading
+
+import grpc
+
+import locate_pb2_grpc
+
+logger = logging.getLogger(__name__)
+
+# Keepalive pings keep idle connections open through NATs and notice dead peers;
+# they must not come more often than locating's GRPC_MIN_PING_INTERVAL_MS allows
+LOCATING_KEEPALIVE_TIME_MS = int(os.environ.get('LOCATING_KEEPALIVE_TIME_MS', '30000'))
+LOCATING_KEEPALIVE_TIMEOUT_MS = int(os.environ.get('LOCATING_KEEPALIVE_TIMEOUT_MS', '10000'))
+# Attempts per call (first try included) when locating is UNAVAILABLE, e.g. restarting
+LOCATING_RETRY_MAX_ATTEMPTS = int(os.environ.get('LOCATING_RETRY_MAX_ATTEMPTS', '3'))
+# Name locating reports its health under; the proto has no package, so it is the bare service name
+LOCATING_HEALTH_SERVICE = "locate"
+
+
+# Function to build the gRPC service config for the locating channel
+# returns the JSON string passed as the grpc.service_config channel option
+def locating_service_config(max_attempts=LOCATING_RETRY_MAX_ATTEMPTS):
+    config = {
+        # Health checking needs a policy that watches every backend; round_robin also spreads
+        # calls over all addresses the locating hostname resolves to
+        "loadBalancingConfig": [{"round_robin": {}}],
+        "healthCheckConfig": {"serviceName": LOCATING_HEALTH_SERVICE},
+    }
+    if max_attempts > 1:
+        config["methodConfig"] = [{
+            "name": [{"service": LOCATING_HEALTH_SERVICE}],
+            # Only UNAVAILABLE is retried: the call never reached the servicer, so repeating it
+            # is safe. Retries stay within the call's own deadline.
+            "retryPolicy": {
+                "maxAttempts": max_attempts,
+                "initialBackoff": "0.1s",
+                "maxBackoff": "1s",
+                "backoffMultiplier": 2,
+                "retryableStatusCodes": ["UNAVAILABLE"],
+            },
+        }]
+    return json.dumps(config)
+
+
+def locating_channel_options():
+    return [
+        ("grpc.service_config", locating_service_config()),
+        ("grpc.enable_retries", 1 if LOCATING_RETRY_MAX_ATTEMPTS > 1 else 0),
+        ("grpc.keepalive_time_ms", LOCATING_KEEPALIVE_TIME_MS),
+        ("grpc.keepalive_timeout_ms", LOCATING_KEEPALIVE_TIMEOUT_MS),
+        ("grpc.keepalive_permit_without_calls", 1),
+        ("grpc.http2.max_pings_without_data", 0),
+        # Requests larger than this are sent once and not retried; full rosters can be several MB
+        ("grpc.per_rpc_retry_buffer_size", 8 * 1024 * 1024),
+    ]
+
+
+class LocatingClient:
+    """
+    Process-wide connection to the locating service. The channel is opened on first use and
+    then shared by every request and thread, so calls reuse one HTTP/2 connection per
+    locating backend instead of handshaking each time. The channel also watches each
+    backend's grpc.health.v1 status and skips backends that report NOT_SERVING.
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self._lock = threading.Lock()
+        self._channel = None
+        self._stub = None
+
+    @property
+    def channel(self):
+        if self._channel is None:
+            with self._lock:
+                if self._channel is None:
+                    self._channel = grpc.insecure_channel(self.target, options=locating_channel_options())
+                    logger.info(f"Opened locating channel to {self.target}")
+        return self._channel
+
+    @property
+    def stub(self):
+        if self._stub is None:
+            self._stub = locate_pb2_grpc.locateStub(self.channel)
+        return self._stub
+
+    def close(self):
+        with self._lock:
+            channel, self._channel, self._stub = self._channel, None, None
+        if channel is not None:
+            channel.close()
@@ -0,0 +1,145 @@
+import hashlib
+import logging
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    def __init__(self, value, etag, last_modified, digest, fetched_at):
+        self.value = value
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.fetched_at = fetched_at
+
+
+class _Refresh:
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class CachedResource:
+    """
+    A JSON resource fetched over HTTP and kept for ttl_seconds.
+    After the TTL, the cached value is still served for up to stale_seconds while one
+    background refresh runs. Past that window, callers wait for the refresh. Refreshes
+    are conditional: they send If-None-Match / If-Modified-Since when the server gave
+    an ETag or Last-Modified, so an unchanged resource costs a 304. Concurrent callers
+    share a single refresh. invalidate() forces the next get() to refresh.
+    extract(body) turns the response body into the cached value and should raise if
+    the body is not usable, so a bad response never replaces a good cached value.
+    """
+
+    def __init__(self, name, url, extract=lambda body: body, ttl_seconds=300, stale_seconds=3600, timeout_seconds=30):
+        self.name = name
+        self.url = url
+        self.extract = extract
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.timeout_seconds = timeout_seconds
+        self._session = requests.Session()
+        self._lock = threading.Lock()
+        self._entry = None
+        self._refresh = None
+        # Bumped by invalidate(), so a refresh already in flight cannot mark its older answer fresh
+        self._generation = 0
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "notModified": 0, "unchanged": 0, "fetched": 0, "errors": 0}
+
+    # Function to read the resource, refreshing it as its age requires
+    # raises if there is no usable value and the refresh fails
+    def get(self):
+        with self._lock:
+            entry = self._entry
+            age = None if entry is None else time.monotonic() - entry.fetched_at
+            if age is not None and age < self.ttl_seconds:
+                self.stats["hits"] += 1
+                return entry.value
+            if age is not None and age < self.ttl_seconds + self.stale_seconds:
+                self.stats["stale"] += 1
+                refresh, leader = self._join_refresh()
+                if leader:
+                    threading.Thread(target=self._run_refresh, args=(refresh,), name=f"refresh-{self.name}", daemon=True).start()
+                return entry.value
+            self.stats["misses"] += 1
+            refresh, leader = self._join_refresh()
+
+        if leader:
+            self._run_refresh(refresh)
+        else:
+            refresh.done.wait()
+        if refresh.error is not None:
+            # An outage of the source should not stop listings while an old copy exists
+            if entry is not None:
+                logger.warning(f"Serving the last cached {self.name}, refresh failed: {refresh.error}")
+                return entry.value
+            raise refresh.error
+        return self._entry.value
+
+    # Function to drop the cached value's freshness, e.g. when the source reports a change
+    # the validators are kept, so the next refresh is still a conditional request
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            if self._entry is not None:
+                self._entry.fetched_at = float("-inf")
+        logger.info(f"Invalidated {self.name} cache")
+
+    def _join_refresh(self):
+        if self._refresh is not None:
+            return self._refresh, False
+        self._refresh = _Refresh()
+        return self._refresh, True
+
+    def _run_refresh(self, refresh):
+        try:
+            self._fetch()
+        except Exception as e:
+            logger.warning(f"Refreshing {self.name} failed: {str(e)}")
+            refresh.error = e
+            with self._lock:
+                self.stats["errors"] += 1
+        finally:
+            with self._lock:
+                self._refresh = None
+            refresh.done.set()
+
+    def _fetch(self):
+        with self._lock:
+            entry = self._entry
+            generation = self._generation
+        headers = {}
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+        started = time.monotonic()
+        response = self._session.get(self.url, headers=headers, timeout=self.timeout_seconds)
+        if response.status_code == 304 and entry is not None:
+            with self._lock:
+                if generation == self._generation:
+                    entry.fetched_at = started
+                self.stats["notModified"] += 1
+            logger.info(f"{self.name} not modified ({(time.monotonic() - started) * 1000:.0f}ms)")
+            return
+        response.raise_for_status()
+
+        # Without validators from the server, an identical body still keeps the old value
+        digest = hashlib.sha256(response.content).hexdigest()
+        unchanged = entry is not None and entry.digest == digest
+        value = entry.value if unchanged else self.extract(response.json())
+        with self._lock:
+            self.stats["unchanged" if unchanged else "fetched"] += 1
+            self._entry = _Entry(
+                value,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+                digest,
+                started if generation == self._generation else float("-inf"),
+            )
+        logger.info(f"Refreshed {self.name} ({len(response.content)} bytes, {(time.monotonic() - started) * 1000:.0f}ms)")
@@ -26,6 +26,12 @@ io.on("connection", (socket) => {
     console.log(`User: ${socket.id} connected`)
     console.log(`Total connected clients: ${io.engine.clientsCount}`)
 
+    // Clients following an async findVolunteers job join its room to receive its updates
+    socket.on("subscribeJob", (jobId) => {
+        socket.join(`job:${jobId}`)
+        console.log(`User: ${socket.id} subscribed to job ${jobId}`)
+    })
+
     socket.on("disconnect", () => {
         console.log(`User: ${socket.id} disconnected`)
         console.log(`Total connected clients: ${io.engine.clientsCount}`)
@@ -57,6 +63,22 @@ app.post('/sendProductListing',async (req,res)=>{
     }
 })
 
+app.post('/sendJobUpdate', async (req, res) => {
+    try {
+        let job = req.body
+        if (!job || !job.jobId) {
+            return res.status(400).json({ error: "jobId is required" })
+        }
+        console.log(`Received update for job ${job.jobId}: ${job.status}${job.step ? ` (${job.step})` : ""}`)
+
+        io.to(`job:${job.jobId}`).emit('findVolunteersJob', job)
+        res.status(200).json({ status: "SUCCESS" })
+    } catch (error) {
+        console.error("Error broadcasting job update:", error.message)
+        res.status(500).json({ error: error.message })
+    }
+})
+
 // Health check endpoint
 app.get('/health', (req, res) => {
     const status = {